@@ -0,0 +1,240 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import Float, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+import schedule
+from archive import ARCHIVES, archive_reaches
+from fragments import fragment_cache
+from models import db, Doctor, Appointment, PrescriptionRollup
+from schedule import WEEKDAY_NAMES
+
+# The report reads these tables; a commit to any of them invalidates cached ranges
+SOURCE_TABLES = ('appointment', 'doctor') + schedule.SOURCE_TABLES
+
+
+class minutes_between(FunctionElement):
+    """Minutes from one TIME column to another, in the database's own dialect"""
+    type = Float()
+    inherit_cache = True
+
+
+@compiles(minutes_between)
+def _minutes_between_default(element, compiler, **kw):
+    start, end = (compiler.process(argument, **kw) for argument in element.clauses)
+    return f'EXTRACT(EPOCH FROM ({end} - {start})) / 60'
+
+
+@compiles(minutes_between, 'sqlite')
+def _minutes_between_sqlite(element, compiler, **kw):
+    start, end = (compiler.process(argument, **kw) for argument in element.clauses)
+    return f'(julianday({end}) - julianday({start})) * 1440'
+
+
+@compiles(minutes_between, 'mysql')
+def _minutes_between_mysql(element, compiler, **kw):
+    start, end = (compiler.process(argument, **kw) for argument in element.clauses)
+    return f'TIME_TO_SEC(TIMEDIFF({end}, {start})) / 60'
+
+
+def current_month(today):
+    start = today.replace(day=1)
+    return start, (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def parse_range(start_value, end_value):
+    """Validated (start, end) dates from ISO strings, defaulting to the current month.
+
+    Raises ValueError with a message fit to show the user.
+    """
+    default_start, default_end = current_month(date.today())
+    try:
+        start = date.fromisoformat(start_value) if start_value else default_start
+        end = date.fromisoformat(end_value) if end_value else default_end
+    except ValueError:
+        raise ValueError('Dates must be in YYYY-MM-DD format')
+    if end < start:
+        raise ValueError('The end date must not be before the start date')
+    max_days = current_app.config['ANALYTICS_MAX_RANGE_DAYS']
+    if (end - start).days + 1 > max_days:
+        raise ValueError(f'The range may cover at most {max_days} days')
+    return start, end
+
+
+def booked_by_doctor_day(start, end):
+    """(doctor_id, date, booked minutes, appointments) for every doctor-day with bookings in the range"""
+    sources = [Appointment]
+    if archive_reaches(Appointment, start):
+        # Ranges older than the archive horizon read the archived appointments too
+        sources.append(ARCHIVES[Appointment][0])
+    rows = []
+    for model in sources:
+        minutes = minutes_between(model.start_time, model.end_time)
+        rows += db.session.execute(
+            db.select(model.doctor_id, model.date, func.sum(minutes), func.count())
+            .where(model.date >= start, model.date <= end)
+            .group_by(model.doctor_id, model.date)
+        ).all()
+    return rows
+
+
+def _summary(booked, capacity, appointments):
+    return {
+        'booked_minutes': round(booked),
+        'capacity_minutes': capacity,
+        'appointments': appointments,
+        'utilization': round(booked / capacity, 4) if capacity else None,
+    }
+
+
+def compute_utilization(start, end):
+    """Booked minutes against scheduled capacity per doctor, specialization and weekday"""
+    compiled = schedule.schedules()
+    doctors = db.session.execute(
+        db.select(Doctor.id, Doctor.first_name, Doctor.surname, Doctor.specialization)
+        .order_by(Doctor.first_name, Doctor.surname)
+    ).all()
+
+    # [booked minutes, appointments] accumulators
+    per_doctor = {doctor.id: [0.0, 0] for doctor in doctors}
+    per_weekday = [[0.0, 0] for _ in range(7)]
+    for doctor_id, day, minutes, count in booked_by_doctor_day(start, end):
+        for totals in (per_doctor.setdefault(doctor_id, [0.0, 0]), per_weekday[day.weekday()]):
+            totals[0] += minutes or 0
+            totals[1] += count
+
+    doctor_rows = []
+    per_specialization = {}
+    weekday_capacity = [0] * 7
+    for doctor in doctors:
+        booked, count = per_doctor[doctor.id]
+        capacity = compiled.capacity_by_weekday(doctor.id, start, end)
+        for day in range(7):
+            weekday_capacity[day] += capacity[day]
+        specialization = doctor.specialization or 'General'
+        doctor_rows.append({'id': doctor.id, 'name': f'{doctor.first_name} {doctor.surname}',
+                            'specialization': specialization, **_summary(booked, sum(capacity), count)})
+        totals = per_specialization.setdefault(specialization, [0.0, 0, 0, 0])
+        totals[0] += booked
+        totals[1] += count
+        totals[2] += 1
+        totals[3] += sum(capacity)
+
+    total_booked = sum(booked for booked, _ in per_weekday)
+    total_count = sum(count for _, count in per_weekday)
+    return {
+        'start': start,
+        'end': end,
+        'totals': _summary(total_booked, sum(weekday_capacity), total_count),
+        'doctors': doctor_rows,
+        'specializations': [
+            {'specialization': name, 'doctors': doctor_count, **_summary(booked, capacity, count)}
+            for name, (booked, count, doctor_count, capacity) in sorted(per_specialization.items())
+        ],
+        'weekdays': [
+            {'weekday': WEEKDAY_NAMES[day], **_summary(per_weekday[day][0], weekday_capacity[day], per_weekday[day][1])}
+            for day in range(7)
+        ],
+    }
+
+
+def _parse_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise ValueError('Months must be in YYYY-MM format')
+
+
+def parse_month_range(start_value, end_value):
+    """Validated (first month, last month) from YYYY-MM strings, defaulting to the last 12 months"""
+    this_month = date.today().replace(day=1)
+    end = _parse_month(end_value) if end_value else this_month
+    start = _parse_month(start_value) if start_value else _add_months(end, -11)
+    if end < start:
+        raise ValueError('The end month must not be before the start month')
+    return start, end
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def prescription_report(start, end, doctor_id=None, top=10):
+    """Monthly totals, top medications and per-doctor volume, read from the rollup table only"""
+    rollup = PrescriptionRollup
+    where = [rollup.month >= start, rollup.month <= end]
+    if doctor_id is not None:
+        where.append(rollup.doctor_id == doctor_id)
+    total = func.sum(rollup.prescription_count)
+
+    by_month = dict(db.session.execute(
+        db.select(rollup.month, total).where(*where).group_by(rollup.month)).all())
+    months = []
+    month = start
+    while month <= end:
+        months.append({'month': month.strftime('%Y-%m'), 'prescriptions': by_month.get(month, 0)})
+        month = _add_months(month, 1)
+
+    medications = db.session.execute(
+        db.select(rollup.medication_name, total.label('total')).where(*where)
+        .group_by(rollup.medication_name).order_by(db.desc('total'), rollup.medication_name).limit(top)).all()
+    doctors = db.session.execute(
+        db.select(rollup.doctor_id, Doctor.first_name, Doctor.surname, total.label('total')).where(*where)
+        .outerjoin(Doctor, Doctor.id == rollup.doctor_id)
+        .group_by(rollup.doctor_id, Doctor.first_name, Doctor.surname).order_by(db.desc('total'))).all()
+    return {
+        'start': start.strftime('%Y-%m'),
+        'end': end.strftime('%Y-%m'),
+        'total': sum(row['prescriptions'] for row in months),
+        'months': months,
+        'top_medications': [{'medication_name': name, 'prescriptions': count} for name, count in medications],
+        'doctors': [{'doctor_id': doctor_id, 'name': f'{first_name} {surname}' if first_name else None,
+                     'prescriptions': count}
+                    for doctor_id, first_name, surname, count in doctors],
+    }
+
+
+class ReportCache:
+    """Per-process cache of computed reports.
+
+    Entries are keyed by the report arguments plus the fragment cache's
+    generation of every table the report reads, so any committed change to
+    those tables makes the old entries unreachable.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, tables, compute):
+        key = (key, fragment_cache().generations(tables))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        value = compute()
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._entries.clear()
+            if fragment_cache().generations(tables) == key[1]:
+                self._entries[key] = (now + self.ttl, value)
+        return value
+
+
+def utilization(start, end):
+    """compute_utilization(), cached per range until appointments, doctors or schedules change"""
+    return current_app.extensions['report_cache'].get_or_compute(
+        ('utilization', start, end), SOURCE_TABLES, lambda: compute_utilization(start, end))
+
+
+def init_analytics(app):
+    app.extensions['report_cache'] = ReportCache(app.config['ANALYTICS_CACHE_TTL'],
+                                                 app.config['ANALYTICS_CACHE_SIZE'])
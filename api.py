@@ -0,0 +1,340 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime, time
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+from flask_login import current_user
+
+import analytics
+import changes
+import slots
+from models import db, normalize_phone, prefix_match, Patient, Doctor, Appointment, Prescription, MedicalRecord
+from routing import read_only
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_SLOTS = 50
+
+
+def _parse_date(value):
+    return date.fromisoformat(value)
+
+
+def _parse_int(value):
+    return int(value)
+
+
+class Resource:
+    """One collection exposed by the API.
+
+    ``fields`` maps the public field names to columns, ``filters`` maps query
+    parameters to functions building a WHERE clause from the raw value (only
+    for indexed columns), and ``doctor_scope`` restricts what a doctor sees.
+    """
+
+    def __init__(self, model, fields, default_fields, filters, doctor_scope=None):
+        self.model = model
+        self.fields = fields
+        self.default_fields = default_fields
+        self.filters = filters
+        self.doctor_scope = doctor_scope
+
+
+def _seen_by_doctor(doctor_id):
+    return Appointment.query.filter(
+        Appointment.patient_id == Patient.id, Appointment.doctor_id == doctor_id
+    ).exists()
+
+
+RESOURCES = {
+    'patients': Resource(
+        Patient,
+        fields={
+            'id': Patient.id,
+            'first_name': Patient.first_name,
+            'surname': Patient.surname,
+            'date_of_birth': Patient.date_of_birth,
+            'gender': Patient.gender,
+            'phone': Patient.phone,
+            'date_created': Patient.date_created,
+        },
+        default_fields=('id', 'first_name', 'surname', 'date_of_birth', 'gender', 'phone'),
+        filters={
+            'first_name': lambda value: prefix_match(db.func.lower(Patient.first_name), value.lower()),
+            'surname': lambda value: prefix_match(db.func.lower(Patient.surname), value.lower()),
+            'phone': lambda value: prefix_match(Patient.phone_digits, normalize_phone(value) or value),
+        },
+        doctor_scope=_seen_by_doctor,
+    ),
+    'doctors': Resource(
+        Doctor,
+        fields={
+            'id': Doctor.id,
+            'first_name': Doctor.first_name,
+            'surname': Doctor.surname,
+            'specialization': Doctor.specialization,
+            'date_created': Doctor.date_created,
+        },
+        default_fields=('id', 'first_name', 'surname', 'specialization'),
+        filters={
+            'specialization': lambda value: Doctor.specialization == value,
+        },
+    ),
+    'appointments': Resource(
+        Appointment,
+        fields={
+            'id': Appointment.id,
+            'patient_id': Appointment.patient_id,
+            'doctor_id': Appointment.doctor_id,
+            'date': Appointment.date,
+            'start_time': Appointment.start_time,
+            'end_time': Appointment.end_time,
+            'diagnosis': Appointment.diagnosis,
+            'date_created': Appointment.date_created,
+        },
+        default_fields=('id', 'patient_id', 'doctor_id', 'date', 'start_time', 'end_time'),
+        filters={
+            'patient_id': lambda value: Appointment.patient_id == _parse_int(value),
+            'doctor_id': lambda value: Appointment.doctor_id == _parse_int(value),
+            'date': lambda value: Appointment.date == _parse_date(value),
+            'date_from': lambda value: Appointment.date >= _parse_date(value),
+            'date_to': lambda value: Appointment.date <= _parse_date(value),
+        },
+        doctor_scope=lambda doctor_id: Appointment.doctor_id == doctor_id,
+    ),
+    'prescriptions': Resource(
+        Prescription,
+        fields={
+            'id': Prescription.id,
+            'patient_id': Prescription.patient_id,
+            'doctor_id': Prescription.doctor_id,
+            'medication_name': Prescription.medication_name,
+            'dosage': Prescription.dosage,
+            'frequency': Prescription.frequency,
+            'duration': Prescription.duration,
+            'instructions': Prescription.instructions,
+            'date_prescribed': Prescription.date_prescribed,
+            'date_created': Prescription.date_created,
+        },
+        default_fields=('id', 'patient_id', 'doctor_id', 'medication_name', 'dosage', 'frequency',
+                        'duration', 'date_prescribed'),
+        filters={
+            'patient_id': lambda value: Prescription.patient_id == _parse_int(value),
+            'doctor_id': lambda value: Prescription.doctor_id == _parse_int(value),
+            'prescribed_from': lambda value: Prescription.date_prescribed >= _parse_date(value),
+            'prescribed_to': lambda value: Prescription.date_prescribed <= _parse_date(value),
+        },
+        doctor_scope=lambda doctor_id: Prescription.doctor_id == doctor_id,
+    ),
+    'medical_records': Resource(
+        MedicalRecord,
+        fields={
+            'id': MedicalRecord.id,
+            'patient_id': MedicalRecord.patient_id,
+            'doctor_id': MedicalRecord.doctor_id,
+            'record_type': MedicalRecord.record_type,
+            'file_name': MedicalRecord.file_name,
+            'file_size': MedicalRecord.file_size,
+            'description': MedicalRecord.description,
+            'upload_date': MedicalRecord.upload_date,
+        },
+        default_fields=('id', 'patient_id', 'doctor_id', 'record_type', 'file_name', 'file_size', 'upload_date'),
+        filters={
+            'patient_id': lambda value: MedicalRecord.patient_id == _parse_int(value),
+            'doctor_id': lambda value: MedicalRecord.doctor_id == _parse_int(value),
+            'record_type': lambda value: MedicalRecord.record_type == value,
+        },
+        doctor_scope=lambda doctor_id: MedicalRecord.doctor_id == doctor_id,
+    ),
+}
+
+
+def _error(message, status=400):
+    response = jsonify({'error': message})
+    response.status_code = status
+    abort(response)
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _json_response(payload):
+    """Compact JSON with an ETag, answering If-None-Match with 304"""
+    body = json.dumps(payload, separators=(',', ':'), default=_json_default)
+    response = Response(body, mimetype='application/json')
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def _encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        _error('Invalid cursor')
+
+
+def _resource_or_404(name):
+    resource = RESOURCES.get(name)
+    if resource is None:
+        _error(f'Unknown resource {name!r}', 404)
+    return resource
+
+
+def _selected_fields(resource):
+    requested = request.args.get('fields')
+    if not requested:
+        return list(resource.default_fields)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        _error(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(resource.fields)}")
+    return names
+
+
+def _base_query(resource, names):
+    # Tuples of the requested columns only; the id always comes first as the cursor key
+    query = db.session.query(resource.model.id, *[resource.fields[name] for name in names])
+    if current_user.doctor_id and resource.doctor_scope is not None:
+        query = query.filter(resource.doctor_scope(current_user.doctor_id))
+    return query
+
+
+@api.before_request
+def require_login():
+    if not current_user.is_authenticated:
+        _error('Authentication required', 401)
+
+
+@api.route('/<resource_name>')
+@read_only
+def collection(resource_name):
+    """A page of a collection: ?fields=, filters, ?limit= and ?cursor= from the previous page"""
+    resource = _resource_or_404(resource_name)
+    names = _selected_fields(resource)
+    query = _base_query(resource, names)
+
+    for parameter, value in request.args.items():
+        if parameter in ('fields', 'limit', 'cursor', 'format'):
+            continue
+        build_filter = resource.filters.get(parameter)
+        if build_filter is None:
+            _error(f"Unknown filter {parameter!r}. Available: {', '.join(resource.filters)}")
+        try:
+            query = query.filter(build_filter(value))
+        except ValueError:
+            _error(f'Invalid value for {parameter!r}')
+
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor')
+    if cursor:
+        query = query.filter(resource.model.id > _decode_cursor(cursor))
+    rows = query.order_by(resource.model.id).limit(limit + 1).all()
+
+    next_cursor = _encode_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+    rows = rows[:limit]
+    if request.args.get('format') == 'compact':
+        # Field names once, then one array per row
+        return _json_response({'fields': names, 'rows': [list(row[1:]) for row in rows],
+                               'next_cursor': next_cursor})
+    return _json_response({'data': [dict(zip(names, row[1:])) for row in rows], 'next_cursor': next_cursor})
+
+
+@api.route('/<resource_name>/<int:object_id>')
+@read_only
+def item(resource_name, object_id):
+    resource = _resource_or_404(resource_name)
+    names = _selected_fields(resource)
+    row = _base_query(resource, names).filter(resource.model.id == object_id).first()
+    if row is None:
+        _error('Not found', 404)
+    return _json_response({'data': dict(zip(names, row[1:]))})
+
+
+@api.route('/changes')
+@read_only
+def change_feed():
+    """Inserts, updates and deletes after ?since= (the last next_cursor), oldest first; admins only.
+
+    ?tables= narrows to some tables, ?limit= caps the page. Poll with the
+    returned next_cursor; 410 means entries were pruned and a full resync is needed.
+    """
+    if current_user.doctor_id:
+        _error('Admin privileges required', 403)
+    since = _decode_cursor(request.args['since']) if request.args.get('since') else 0
+    if changes.cursor_expired(since):
+        _error('Cursor expired: changes after it were pruned, so resync from scratch', 410)
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1),
+                current_app.config['CHANGE_FEED_MAX_LIMIT'])
+    tables = [name.strip() for name in request.args.get('tables', '').split(',') if name.strip()]
+
+    entries, next_seq, has_more = changes.read_changes(since, limit, tables,
+                                                       current_app.config['CHANGE_FEED_SETTLE_SECONDS'])
+    return _json_response({
+        'changes': [{'seq': entry.seq, 'table': entry.table_name, 'id': entry.row_id, 'action': entry.action,
+                     'changed_at': entry.changed_at} for entry in entries],
+        'next_cursor': _encode_cursor(next_seq),
+        'has_more': has_more,
+    })
+
+
+@api.route('/analytics/utilization')
+@read_only
+def utilization():
+    """Booked minutes against capacity for ?start=&end= (ISO dates, default the current month); admins only"""
+    if current_user.doctor_id:
+        _error('Admin privileges required', 403)
+    try:
+        start, end = analytics.parse_range(request.args.get('start'), request.args.get('end'))
+    except ValueError as e:
+        _error(str(e))
+    return _json_response(analytics.utilization(start, end))
+
+
+@api.route('/analytics/prescriptions')
+@read_only
+def prescription_analytics():
+    """Prescribing volume for ?start=&end= (YYYY-MM, default the last 12 months), ?top= medications.
+
+    Admins may narrow to ?doctor_id=; doctors always get their own figures.
+    """
+    try:
+        start, end = analytics.parse_month_range(request.args.get('start'), request.args.get('end'))
+    except ValueError as e:
+        _error(str(e))
+    doctor_id = current_user.doctor_id or request.args.get('doctor_id', type=int)
+    top = min(max(request.args.get('top', 10, type=int), 1), 100)
+    return _json_response(analytics.prescription_report(start, end, doctor_id, top))
+
+
+@api.route('/slots')
+@read_only
+def free_slots():
+    """The next free slots: ?duration= minutes, ?earliest= date, ?specialization=, ?limit="""
+    duration = request.args.get('duration', 30, type=int)
+    if not 1 <= duration <= slots.MAX_DURATION_MINUTES:
+        _error(f'duration must be between 1 and {slots.MAX_DURATION_MINUTES} minutes')
+    try:
+        earliest = _parse_date(request.args['earliest']) if request.args.get('earliest') else date.today()
+    except ValueError:
+        _error('earliest must be a date in YYYY-MM-DD format')
+    limit = min(max(request.args.get('limit', 5, type=int), 1), MAX_SLOTS)
+
+    found, searched_until = slots.next_free_slots(duration, earliest, limit, request.args.get('specialization'))
+    return _json_response({
+        'slots': [{'doctor_id': doctor.id, 'doctor_name': f'{doctor.first_name} {doctor.surname}',
+                   'specialization': doctor.specialization, 'date': start.date(),
+                   'start_time': start.strftime('%H:%M'), 'end_time': end.strftime('%H:%M')}
+                  for start, doctor, end in found],
+        'searched_until': searched_until,
+    })
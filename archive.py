@@ -0,0 +1,64 @@
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, literal, union_all
+
+import changes
+from models import db, Appointment, ArchivedAppointment, Prescription, ArchivedPrescription
+
+# Live table -> (archive table, the date a row is archived by)
+ARCHIVES = {
+    Appointment: (ArchivedAppointment, 'date'),
+    Prescription: (ArchivedPrescription, 'date_prescribed'),
+}
+
+
+def horizon(days=None):
+    """Rows dated before this are archived"""
+    if days is None:
+        days = current_app.config['ARCHIVE_AFTER_DAYS']
+    return date.today() - timedelta(days=days)
+
+
+def archive_rows(live, before, batch_size, pause=0):
+    """Move rows of ``live`` dated before ``before`` to its archive table; returns how many.
+
+    Each batch is its own short transaction (copy, delete, change feed), so
+    the live table stays writable while a large backlog is moved.
+    """
+    archived, date_name = ARCHIVES[live]
+    table = live.__tablename__
+    columns = [column.name for column in live.__table__.columns]
+    moved = 0
+    while True:
+        ids = db.session.scalars(
+            db.select(live.id).where(getattr(live, date_name) < before)
+            .order_by(live.id).limit(batch_size)).all()
+        if not ids:
+            return moved
+        rows = db.select(*(live.__table__.c[name] for name in columns),
+                         literal(datetime.utcnow()).label('archived_at')).where(live.id.in_(ids))
+        db.session.execute(insert(archived).from_select(columns + ['archived_at'], rows))
+        db.session.execute(delete(live).where(live.id.in_(ids)), execution_options={'synchronize_session': False})
+        changes.record(db.session, table, ids, action='archive')
+        db.session.commit()
+        moved += len(ids)
+        if pause:
+            time.sleep(pause)  # let other writers in between batches
+
+
+def archive_reaches(live, start):
+    """Whether the archive of ``live`` holds rows dated on or after ``start``"""
+    archived, date_name = ARCHIVES[live]
+    newest = db.session.scalar(db.select(func.max(getattr(archived, date_name))))
+    return newest is not None and newest >= start
+
+
+def with_archive(live, select_rows):
+    """``select_rows(model)`` over the live table, unioned with its archive.
+
+    ``select_rows`` must only use columns the two tables share.
+    """
+    archived, _ = ARCHIVES[live]
+    return union_all(select_rows(live), select_rows(archived)).subquery()
@@ -0,0 +1,190 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import threading
+
+from flask import current_app, url_for
+from werkzeug.exceptions import NotFound
+from werkzeug.utils import send_file
+from werkzeug.wrappers import Request
+
+try:
+    import brotli
+except ImportError:  # brotli variants are optional
+    brotli = None
+
+# Text assets worth precompressing (images and fonts are already compressed)
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.map'}
+MANIFEST_NAME = 'manifest.json'
+DIGEST_LENGTH = 12
+# style.3f2a1b9c0d12.css -> ('style', '3f2a1b9c0d12', '.css')
+_FINGERPRINTED = re.compile(r'^(.+)\.([0-9a-f]{%d})(\.[^./]+)$' % DIGEST_LENGTH)
+# Encodings we may have built, best first
+_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def fingerprinted_name(filename, data):
+    stem, extension = os.path.splitext(filename)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:DIGEST_LENGTH]}{extension}'
+
+
+def _static_files(static_folder, build_dir):
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(build_dir):
+            dirs[:] = []
+            continue
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != os.path.abspath(build_dir)]
+        for name in files:
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, static_folder).replace(os.sep, '/'), path
+
+
+def build_assets(static_folder, build_dir, min_size):
+    """Copy every static file to a content-hashed name with .gz/.br variants and write the manifest.
+
+    Returns a list of (filename, fingerprinted name, raw bytes, gzip bytes, brotli bytes).
+    """
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir)
+
+    manifest = {}
+    report = []
+    for filename, path in sorted(_static_files(static_folder, build_dir)):
+        with open(path, 'rb') as source:
+            data = source.read()
+        name = fingerprinted_name(filename, data)
+        target = os.path.join(build_dir, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as out:
+            out.write(data)
+        manifest[filename] = name
+
+        gzip_size = brotli_size = None
+        if os.path.splitext(filename)[1] in COMPRESSIBLE_EXTENSIONS and len(data) >= min_size:
+            # mtime=0 keeps the build reproducible
+            gzip_size = _write_if_smaller(target + '.gz', gzip.compress(data, 9, mtime=0), len(data))
+            if brotli is not None:
+                brotli_size = _write_if_smaller(target + '.br', brotli.compress(data, quality=11), len(data))
+        report.append((filename, name, len(data), gzip_size, brotli_size))
+
+    with open(os.path.join(build_dir, MANIFEST_NAME), 'w') as out:
+        json.dump(manifest, out, indent=2, sort_keys=True)
+    return report
+
+
+def _write_if_smaller(path, data, original_size):
+    if len(data) >= original_size:
+        return None
+    with open(path, 'wb') as out:
+        out.write(data)
+    return len(data)
+
+
+class AssetManifest:
+    """Maps static filenames to their fingerprinted names.
+
+    With a build (``flask assets-build``) the names come from the manifest and
+    the precompressed variants are served. Without one, each file is hashed
+    on first use and served as-is, so development needs no build step.
+    """
+
+    def __init__(self, static_folder, build_dir):
+        self.static_folder = static_folder
+        self.build_dir = build_dir
+        self._lock = threading.Lock()
+        manifest_path = os.path.join(build_dir, MANIFEST_NAME)
+        self.built = os.path.exists(manifest_path)
+        if self.built:
+            with open(manifest_path) as manifest:
+                self._names = json.load(manifest)
+        else:
+            self._names = {}
+            self._hashed_at = {}
+
+    def name_for(self, filename):
+        if self.built:
+            return self._names.get(filename, filename)
+        path = os.path.join(self.static_folder, filename)
+        stat = os.stat(path)
+        with self._lock:
+            # Re-hash when the file changes during development
+            if self._hashed_at.get(filename) != (stat.st_mtime_ns, stat.st_size):
+                with open(path, 'rb') as source:
+                    self._names[filename] = fingerprinted_name(filename, source.read())
+                self._hashed_at[filename] = (stat.st_mtime_ns, stat.st_size)
+            return self._names[filename]
+
+    def resolve(self, requested):
+        """The file to serve for a fingerprinted name, or None if it is not current"""
+        match = _FINGERPRINTED.match(requested)
+        if match is None or '..' in requested.split('/'):
+            return None
+        filename = match.group(1) + match.group(3)
+        try:
+            current = self.name_for(filename)
+        except OSError:
+            return None
+        if current != requested:
+            return None
+        if self.built:
+            return os.path.join(self.build_dir, requested)
+        return os.path.join(self.static_folder, filename)
+
+
+def asset_url(filename):
+    """URL of a static file that changes whenever its contents do"""
+    return url_for('asset', filename=current_app.extensions['assets'].name_for(filename))
+
+
+class AssetMiddleware:
+    """Serve /assets/ ahead of Flask.
+
+    Asset requests skip the login and session machinery entirely, so their
+    responses are never marked ``Vary: Cookie`` and stay cacheable.
+    """
+
+    def __init__(self, wsgi_app, manifest, prefix, max_age):
+        self.wsgi_app = wsgi_app
+        self.manifest = manifest
+        self.prefix = prefix.rstrip('/') + '/'
+        self.max_age = max_age
+
+    def __call__(self, environ, start_response):
+        if not environ.get('PATH_INFO', '').startswith(self.prefix):
+            return self.wsgi_app(environ, start_response)
+        return self.respond(Request(environ))(environ, start_response)
+
+    def respond(self, request):
+        requested = request.path[len(self.prefix):]
+        path = self.manifest.resolve(requested)
+        if path is None:
+            return NotFound()
+        mimetype = mimetypes.guess_type(requested)[0] or 'application/octet-stream'
+
+        encoding = None
+        for candidate, suffix in _ENCODINGS:
+            if request.accept_encodings[candidate] and os.path.exists(path + suffix):
+                encoding, path = candidate, path + suffix
+                break
+
+        response = send_file(path, request.environ, mimetype=mimetype, max_age=self.max_age)
+        # The URL changes with the content, so browsers never need to revalidate
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+
+def init_assets(app):
+    build_dir = app.config['ASSET_BUILD_DIR'] or os.path.join(app.static_folder, 'dist')
+    app.extensions['assets'] = AssetManifest(app.static_folder, build_dir)
+    app.add_url_rule('/assets/<path:filename>', 'asset', build_only=True)
+    app.wsgi_app = AssetMiddleware(app.wsgi_app, app.extensions['assets'], '/assets', app.config['STATIC_MAX_AGE'])
+    app.jinja_env.globals['asset_url'] = asset_url
@@ -0,0 +1,241 @@
+import atexit
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, has_app_context, has_request_context
+from flask_login import current_user
+from sqlalchemy import event, inspect, insert
+
+from models import db, AuditEntry
+from routing import RoutingSession
+
+# Clinical tables whose changes are recorded
+AUDITED_TABLES = ('patient', 'appointment', 'prescription', 'medical_record')
+# Session.info key holding the entries of the current transaction
+PENDING_KEY = 'audit_pending'
+_STOP = object()
+WRITE_ATTEMPTS = 3
+
+
+def _actor():
+    if has_request_context() and current_user and current_user.is_authenticated:
+        return current_user.id, current_user.username
+    return None, None
+
+
+def record(db_session, action, table, row_id, changes):
+    """Add an entry to the current transaction; it's written only if the transaction commits.
+
+    For changes made outside the unit of work, e.g. bulk UPDATEs.
+    ``changes`` maps each field to [before, after].
+    """
+    user_id, username = _actor()
+    db_session.info.setdefault(PENDING_KEY, []).append({
+        'occurred_at': datetime.utcnow(), 'user_id': user_id, 'username': username,
+        'action': action, 'table_name': table, 'row_id': row_id, 'changes': changes,
+    })
+
+
+def _diff(obj, action):
+    state = inspect(obj)
+    changes = {}
+    for column in state.mapper.column_attrs:
+        key = column.key
+        if action == 'update':
+            history = state.attrs[key].history
+            if history.has_changes():
+                before = history.deleted[0] if history.deleted else None
+                after = history.added[0] if history.added else None
+                changes[key] = [before, after]
+        else:
+            value = state.dict.get(key)
+            if value is not None:
+                changes[key] = [None, value] if action == 'insert' else [value, None]
+    return changes
+
+
+def _collect_entries(db_session, flush_context):
+    # Still the pre-flush state here: ids are assigned but history isn't reset yet
+    for action, objects in (('insert', db_session.new), ('update', db_session.dirty),
+                            ('delete', db_session.deleted)):
+        for obj in objects:
+            table = getattr(obj, '__tablename__', None)
+            if table not in AUDITED_TABLES:
+                continue
+            changes = _diff(obj, action)
+            if changes:
+                record(db_session, action, table, getattr(obj, 'id', None), changes)
+
+
+def _submit_entries(db_session):
+    entries = db_session.info.pop(PENDING_KEY, None)
+    if entries and has_app_context() and 'audit_log' in current_app.extensions:
+        current_app.extensions['audit_log'].submit(entries)
+
+
+def _forget_entries(db_session):
+    db_session.info.pop(PENDING_KEY, None)
+
+
+event.listen(RoutingSession, 'after_flush', _collect_entries)
+event.listen(RoutingSession, 'after_commit', _submit_entries)
+event.listen(RoutingSession, 'after_rollback', _forget_entries)
+
+
+class AuditWriter:
+    """Writes audit entries to the append-only audit_log table from a background thread.
+
+    Committing a request only puts its entries on a bounded in-memory queue.
+    The writer thread inserts them in batches of up to ``batch_size``,
+    waiting at most ``flush_interval`` seconds to fill one. When the queue is
+    full, committers wait up to ``enqueue_timeout`` seconds for room and then
+    write their entries themselves, so nothing is dropped. The queue is
+    drained before the process exits.
+    """
+
+    def __init__(self, engine, logger, max_queue, batch_size, flush_interval, enqueue_timeout):
+        self.engine = engine
+        self.logger = logger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {'queued': 0, 'written': 0, 'batches': 0, 'waited': 0, 'written_inline': 0, 'failed': 0}
+
+    def _ensure_started(self):
+        # The thread is only started on first use
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def submit(self, entries):
+        self._ensure_started()
+        for entry in entries:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                self._count('waited')
+                try:
+                    self._queue.put(entry, timeout=self.enqueue_timeout)
+                except queue.Full:
+                    # The writer can't keep up; write it here rather than lose it
+                    self._write([entry])
+                    self._count('written_inline')
+                    continue
+            self._count('queued')
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            entry = self._queue.get()
+            if entry is _STOP:
+                self._queue.task_done()
+                break
+            batch = [entry]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    entry = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    self._queue.task_done()
+                    break
+                batch.append(entry)
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch):
+        rows = [dict(entry, changes=json.dumps(entry['changes'], default=str, sort_keys=True)) for entry in batch]
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(insert(AuditEntry), rows)
+            except Exception:
+                if attempt + 1 < WRITE_ATTEMPTS:
+                    time.sleep(0.5 * (attempt + 1))  # e.g. the database is briefly locked
+                    continue
+                # Last resort: the entries still end up in the application log
+                self.logger.exception('Could not write %d audit entries: %s', len(rows), rows)
+                self._count('failed', len(rows))
+                return
+            self._count('written', len(rows))
+            self._count('batches')
+            return
+
+    def flush(self):
+        """Block until every queued entry has been written"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self, timeout=30):
+        """Write out what is queued and stop the thread.
+
+        Waits up to ``timeout`` seconds for the thread; whatever it hasn't
+        taken off the queue by then is written from the calling thread.
+        """
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            self._drain()  # the writer is stuck or far behind
+            return
+        thread.join(max(deadline - time.monotonic(), 0))
+        if thread.is_alive():
+            self._drain()
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            if entry is not _STOP:
+                batch.append(entry)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        batches = stats['batches'] or 1
+        return {**stats, 'queue_depth': self._queue.qsize(), 'max_queue': self._queue.maxsize,
+                'avg_batch_size': round(stats['written'] / batches, 1)}
+
+
+def init_audit(app):
+    if not app.config['AUDIT_LOG']:
+        return
+    with app.app_context():
+        engine = db.engine  # always the primary; the read pool is query-only
+    app.extensions['audit_log'] = AuditWriter(engine, app.logger,
+                                              app.config['AUDIT_QUEUE_SIZE'],
+                                              app.config['AUDIT_BATCH_SIZE'],
+                                              app.config['AUDIT_FLUSH_INTERVAL_MS'] / 1000,
+                                              app.config['AUDIT_ENQUEUE_TIMEOUT_MS'] / 1000)
+
+
+def audit_log():
+    return current_app.extensions.get('audit_log')
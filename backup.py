@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+
+# A backup directory holds content-addressed record files shared by every
+# snapshot, an index of what has been hashed and copied so far, and one
+# folder per snapshot with the database copy and its manifest:
+#
+#   blobs/ab/ab12...        one copy of each distinct record file, named by its SHA-256
+#   blobs.json              {record path: {size, mtime_ns, sha256}} from earlier runs
+#   snapshots/<stamp>/      hospital.db and manifest.json
+#
+# A snapshot is complete once its manifest exists; it is written last.
+BLOB_DIR = 'blobs'
+BLOB_INDEX = 'blobs.json'
+SNAPSHOT_DIR = 'snapshots'
+MANIFEST_NAME = 'manifest.json'
+DATABASE_NAME = 'hospital.db'
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json(path, data):
+    # Written next to the target and renamed, so a crash never leaves half a file
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as target:
+        json.dump(data, target, indent=1, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def _read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path) as source:
+        return json.load(source)
+
+
+def blob_path(root, sha256):
+    return os.path.join(root, BLOB_DIR, sha256[:2], sha256)
+
+
+def _local(path):
+    # Records uploaded on Windows are stored with backslashes
+    return path.replace('\\', os.sep)
+
+
+class _Restarting(Exception):
+    pass
+
+
+def copy_database(engine, target_path, pages, sleep, max_restarts):
+    """Copy a live SQLite database with the online backup API.
+
+    ``pages`` are copied per step and the source is released for ``sleep``
+    seconds between steps, so writers carry on while it runs. A write from
+    another connection starts the copy over; after ``max_restarts`` of those
+    it is done in a single step instead, which holds a read lock on the
+    source for the whole copy. Returns (integrity_check result of the copy,
+    whether it fell back to a single step).
+    """
+    last_remaining = [None]
+    restarts = [0]
+
+    def progress(status, remaining, total):
+        # Remaining pages only go back up when the copy started over
+        if last_remaining[0] is not None and remaining >= last_remaining[0]:
+            restarts[0] += 1
+            if restarts[0] > max_restarts:
+                raise _Restarting()
+        last_remaining[0] = remaining
+
+    connection = engine.raw_connection()
+    try:
+        target = sqlite3.connect(target_path)
+        try:
+            single_step = False
+            try:
+                connection.driver_connection.backup(target, pages=pages, progress=progress, sleep=sleep)
+            except _Restarting:
+                connection.driver_connection.backup(target, pages=-1)
+                single_step = True
+            # A single self-contained file, whatever journal mode the source uses
+            target.execute('PRAGMA journal_mode=DELETE')
+            return target.execute('PRAGMA integrity_check').fetchone()[0], single_step
+        finally:
+            target.close()
+    finally:
+        connection.close()
+
+
+def _database_details(path):
+    connection = sqlite3.connect(path)
+    try:
+        try:
+            revision = connection.execute('SELECT version_num FROM alembic_version').fetchone()
+        except sqlite3.OperationalError:
+            revision = None
+        records = connection.execute('SELECT id, file_path FROM medical_record ORDER BY id').fetchall()
+    finally:
+        connection.close()
+    return (revision[0] if revision else None), records
+
+
+def _store_blob(root, path, index):
+    """Hash ``path`` and copy it into the blob store unless an earlier run already did.
+
+    Returns (sha256, size, copied). Files whose size and mtime match the
+    index are not read again.
+    """
+    stat = os.stat(path)
+    known = index.get(path)
+    if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+        sha256 = known['sha256']
+    else:
+        sha256 = file_sha256(path)
+    target = blob_path(root, sha256)
+    copied = False
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temporary = target + '.tmp'
+        shutil.copyfile(path, temporary)
+        if file_sha256(temporary) != sha256:
+            os.remove(temporary)
+            raise IOError(f'{path} changed while it was being backed up')
+        os.replace(temporary, target)
+        copied = True
+    index[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+    return sha256, stat.st_size, copied
+
+
+def create_snapshot(engine, root, pages=256, sleep=0.01, max_restarts=5, log=print):
+    """Back up the database and every medical record file it refers to; returns the snapshot folder.
+
+    Only record files not already in the blob store are copied, and every
+    copy is checked against its SHA-256.
+    """
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    snapshot = os.path.join(root, SNAPSHOT_DIR, stamp)
+    os.makedirs(snapshot)
+    database_path = os.path.join(snapshot, DATABASE_NAME)
+    integrity, single_step = copy_database(engine, database_path, pages, sleep, max_restarts)
+    if single_step:
+        log(f'The database copy restarted more than {max_restarts} times under concurrent writes; '
+            'it was finished in a single step instead')
+    if integrity != 'ok':
+        raise IOError(f'The database copy failed its integrity check: {integrity}')
+    revision, record_rows = _database_details(database_path)
+
+    # Records are read from the copy, so the files match the snapshot's rows
+    index_path = os.path.join(root, BLOB_INDEX)
+    index = _read_json(index_path, {})
+    records, missing, copied_files, copied_bytes = [], [], 0, 0
+    for record_id, path in record_rows:
+        if not os.path.exists(_local(path)):
+            missing.append(path)
+            continue
+        sha256, size, copied = _store_blob(root, _local(path), index)
+        records.append({'id': record_id, 'path': path, 'sha256': sha256, 'size': size})
+        if copied:
+            copied_files += 1
+            copied_bytes += size
+    # Forget files that are gone, so the index doesn't grow forever
+    current = {_local(record['path']) for record in records}
+    _write_json(index_path, {path: entry for path, entry in index.items() if path in current})
+
+    manifest = {
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'database': {'file': DATABASE_NAME, 'revision': revision,
+                     'size': os.path.getsize(database_path), 'sha256': file_sha256(database_path)},
+        'records': records,
+        'missing_records': missing,
+    }
+    _write_json(os.path.join(snapshot, MANIFEST_NAME), manifest)
+    log(f'Snapshot {snapshot}: database {manifest["database"]["size"]:,} bytes, {len(records)} record file(s), '
+        f'{copied_files} new ({copied_bytes:,} bytes copied)')
+    if missing:
+        log(f'{len(missing)} record file(s) were missing and are not in the snapshot')
+    return snapshot
+
+
+def load_manifest(snapshot):
+    path = os.path.join(snapshot, MANIFEST_NAME)
+    if not os.path.exists(path):
+        raise IOError(f'{snapshot} has no {MANIFEST_NAME}; the snapshot is incomplete')
+    return _read_json(path, None)
+
+
+def verify_snapshot(snapshot):
+    """Problems found re-checking every checksum of a snapshot (an empty list when it is sound)"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(snapshot)))
+    manifest = load_manifest(snapshot)
+    problems = []
+    database = manifest['database']
+    database_path = os.path.join(snapshot, database['file'])
+    if not os.path.exists(database_path):
+        problems.append(f'{database["file"]} is missing')
+    elif file_sha256(database_path) != database['sha256']:
+        problems.append(f'{database["file"]} does not match its checksum')
+    for record in manifest['records']:
+        path = blob_path(root, record['sha256'])
+        if not os.path.exists(path):
+            problems.append(f'{record["path"]}: blob {record["sha256"]} is missing')
+        elif file_sha256(path) != record['sha256']:
+            problems.append(f'{record["path"]}: blob {record["sha256"]} does not match its checksum')
+    return problems
+
+
+def restore_snapshot(snapshot, target_dir):
+    """Write a verified snapshot's database and record files under ``target_dir``; returns the database path"""
+    problems = verify_snapshot(snapshot)
+    if problems:
+        raise IOError('The snapshot failed verification: ' + '; '.join(problems))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(snapshot)))
+    manifest = load_manifest(snapshot)
+    os.makedirs(target_dir, exist_ok=True)
+    database_path = os.path.join(target_dir, manifest['database']['file'])
+    shutil.copyfile(os.path.join(snapshot, manifest['database']['file']), database_path)
+    for record in manifest['records']:
+        # Record paths are relative to the app's working directory
+        relative = os.path.normpath(_local(record['path']))
+        if os.path.isabs(relative) or relative.startswith(os.pardir):
+            raise IOError(f'{record["path"]} is outside the app folder; not restoring it')
+        path = os.path.join(target_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(blob_path(root, record['sha256']), path)
+    return database_path
@@ -0,0 +1,206 @@
+from datetime import date
+
+from sqlalchemy import and_, delete, exists, func, update
+from sqlalchemy.orm import aliased
+
+import audit
+import changes
+from models import (db, Appointment, AppointmentSeries, ArchivedAppointment, ArchivedPrescription, Doctor,
+                    DoctorSchedule, MedicalRecord, Patient, Prescription, ScheduleException, User)
+from schedule import schedules
+
+# Administrative changes to many rows at once. Each is planned first (the
+# dry run shows the plan) and then applied with set-based statements whose
+# EXISTS guards are checked again by the database, so rows that gained a
+# dependent or a conflict since the plan are left alone.
+
+# Rows that keep a patient or doctor from being deleted, with how they're described
+PATIENT_DEPENDENTS = (
+    (Appointment.patient_id, 'appointments'),
+    (ArchivedAppointment.patient_id, 'archived appointments'),
+    (AppointmentSeries.patient_id, 'recurring bookings'),
+    (Prescription.patient_id, 'prescriptions'),
+    (ArchivedPrescription.patient_id, 'archived prescriptions'),
+    (MedicalRecord.patient_id, 'medical records'),
+)
+DOCTOR_DEPENDENTS = (
+    (Appointment.doctor_id, 'appointments'),
+    (ArchivedAppointment.doctor_id, 'archived appointments'),
+    (AppointmentSeries.doctor_id, 'recurring bookings'),
+    (Prescription.doctor_id, 'prescriptions'),
+    (ArchivedPrescription.doctor_id, 'archived prescriptions'),
+    (MedicalRecord.doctor_id, 'medical records'),
+)
+# Rows deleted along with their doctor
+DOCTOR_OWNED = (DoctorSchedule.doctor_id, ScheduleException.doctor_id, User.doctor_id)
+
+
+def _unreferenced(dependents, key):
+    """No dependent row points at ``key``"""
+    return and_(*(~exists().where(column == key) for column, _ in dependents))
+
+
+def _audit_deletes(table, rows):
+    for row in rows:
+        audit.record(db.session, 'delete', table, row['id'],
+                     {key: [value, None] for key, value in row.items() if value is not None})
+
+
+def _remaining(model, ids):
+    return set(db.session.scalars(db.select(model.id).where(model.id.in_(ids))))
+
+
+def plan_delete(model, dependents, ids):
+    """(deletable rows, [(row, reasons)] kept) among the patients or doctors with these ids"""
+    rows = db.session.execute(
+        db.select(model.id, model.first_name, model.surname,
+                  *(exists().where(column == model.id) for column, _ in dependents))
+        .where(model.id.in_(ids)).order_by(model.first_name, model.surname)).all()
+    deletable, kept = [], []
+    for row in rows:
+        reasons = [reason for (_, reason), blocked in zip(dependents, row[3:]) if blocked]
+        if reasons:
+            kept.append((row, reasons))
+        else:
+            deletable.append(row)
+    return deletable, kept
+
+
+def dependent_counts(dependents, key):
+    """[(reason, count)] of the dependents that refer to ``key``"""
+    counts = db.session.execute(db.select(
+        *(db.select(func.count()).where(column == key).scalar_subquery() for column, _ in dependents))).one()
+    return [(reason, count) for (_, reason), count in zip(dependents, counts) if count]
+
+
+def delete_patients(ids):
+    """Delete the patients nothing refers to with one guarded DELETE; returns the deleted ids"""
+    guard = _unreferenced(PATIENT_DEPENDENTS, Patient.id)
+    before = [dict(row) for row in db.session.execute(
+        db.select(Patient.__table__).where(Patient.id.in_(ids), guard)).mappings()]
+    candidates = [row['id'] for row in before]
+    if not candidates:
+        return []
+    db.session.execute(delete(Patient).where(Patient.id.in_(candidates), guard),
+                       execution_options={'synchronize_session': False})
+    deleted = set(candidates) - _remaining(Patient, candidates)
+    _audit_deletes('patient', [row for row in before if row['id'] in deleted])
+    changes.record(db.session, 'patient', sorted(deleted), action='delete')
+    db.session.commit()
+    return sorted(deleted)
+
+
+def delete_doctors(ids):
+    """Delete the doctors nothing refers to, with their schedules and login accounts.
+
+    Returns (deleted doctor ids, deleted user ids).
+    """
+    candidates = list(db.session.scalars(
+        db.select(Doctor.id).where(Doctor.id.in_(ids), _unreferenced(DOCTOR_DEPENDENTS, Doctor.id))))
+    if not candidates:
+        return [], []
+    owned = {column: list(db.session.scalars(db.select(column.class_.id).where(column.in_(candidates))))
+             for column in DOCTOR_OWNED}
+    # What a doctor owns goes first, under the same guard, for databases that enforce foreign keys
+    for column in DOCTOR_OWNED:
+        db.session.execute(
+            delete(column.class_).where(column.in_(candidates), _unreferenced(DOCTOR_DEPENDENTS, column)),
+            execution_options={'synchronize_session': False})
+    db.session.execute(
+        delete(Doctor).where(Doctor.id.in_(candidates), _unreferenced(DOCTOR_DEPENDENTS, Doctor.id)),
+        execution_options={'synchronize_session': False})
+    deleted = sorted(set(candidates) - _remaining(Doctor, candidates))
+    changes.record(db.session, 'doctor', deleted, action='delete')
+    for column, owned_ids in owned.items():
+        owned[column] = sorted(set(owned_ids) - _remaining(column.class_, owned_ids))
+        changes.record(db.session, column.class_.__tablename__, owned[column], action='delete')
+    db.session.commit()
+    return deleted, owned[User.doctor_id]
+
+
+def _appointment_rows(*conditions, extra=()):
+    return db.session.execute(
+        db.select(Appointment.id, Appointment.date, Appointment.start_time, Appointment.end_time,
+                  Patient.first_name, Patient.surname, *extra)
+        .join(Patient, Appointment.patient_id == Patient.id)
+        .where(*conditions).order_by(Appointment.date, Appointment.start_time)).all()
+
+
+def _doctor_conflict(doctor_id, dialect=None):
+    """Another appointment of ``doctor_id`` overlaps the outer appointment"""
+    if dialect == 'mysql':
+        # MySQL refuses an UPDATE that reads its own table (error 1093) unless
+        # the reading happens in a materialized derived table; DISTINCT keeps
+        # the optimizer from merging it back in
+        other = (db.select(Appointment.date, Appointment.start_time, Appointment.end_time)
+                 .where(Appointment.doctor_id == doctor_id).distinct().subquery('other'))
+        return exists().where(other.c.date == Appointment.date, other.c.start_time < Appointment.end_time,
+                              other.c.end_time > Appointment.start_time)
+    other = aliased(Appointment)
+    return exists().where(other.doctor_id == doctor_id, other.date == Appointment.date,
+                          other.start_time < Appointment.end_time, other.end_time > Appointment.start_time)
+
+
+def plan_reassign(from_doctor_id, to_doctor_id, start, end):
+    """(movable appointments, [(appointment, reason)] that must stay) between start and end inclusive"""
+    rows = _appointment_rows(Appointment.doctor_id == from_doctor_id, Appointment.date >= start,
+                             Appointment.date <= end, extra=(_doctor_conflict(to_doctor_id),))
+    compiled = schedules()
+    movable, kept = [], []
+    for row in rows:
+        if row[-1]:
+            kept.append((row, 'the new doctor has an overlapping appointment'))
+        elif not compiled.is_open(to_doctor_id, row.date, row.start_time, row.end_time):
+            kept.append((row, "outside the new doctor's working hours"))
+        else:
+            movable.append(row)
+    return movable, kept
+
+
+def reassign_appointments(from_doctor_id, to_doctor_id, start, end):
+    """Move the movable appointments with one UPDATE guarded against overlaps; returns the moved ids"""
+    movable, _ = plan_reassign(from_doctor_id, to_doctor_id, start, end)
+    ids = [row.id for row in movable]
+    if not ids:
+        return []
+    dialect = db.session.connection().dialect.name
+    db.session.execute(
+        update(Appointment)
+        .where(Appointment.id.in_(ids), Appointment.doctor_id == from_doctor_id,
+               ~_doctor_conflict(to_doctor_id, dialect))
+        .values(doctor_id=to_doctor_id),
+        execution_options={'synchronize_session': False})
+    moved = sorted(set(db.session.scalars(
+        db.select(Appointment.id).where(Appointment.id.in_(ids), Appointment.doctor_id == to_doctor_id))))
+    for appointment_id in moved:
+        audit.record(db.session, 'update', 'appointment', appointment_id, {'doctor_id': [from_doctor_id, to_doctor_id]})
+    changes.record(db.session, 'appointment', moved)
+    db.session.commit()
+    return moved
+
+
+def plan_cancel_day(doctor_id, day):
+    """The doctor's appointments on ``day``"""
+    return _appointment_rows(Appointment.doctor_id == doctor_id, Appointment.date == day)
+
+
+def cancel_day(doctor_id, day, close_day=False, reason=None):
+    """Delete the doctor's appointments on ``day`` with one DELETE; returns the cancelled ids.
+
+    With ``close_day`` the day is also taken off the doctor's schedule, so
+    nobody books it again.
+    """
+    if day < date.today():
+        raise ValueError('Only today or later can be cancelled')
+    condition = and_(Appointment.doctor_id == doctor_id, Appointment.date == day)
+    before = [dict(row) for row in db.session.execute(db.select(Appointment.__table__).where(condition)).mappings()]
+    ids = [row['id'] for row in before]
+    if ids:
+        db.session.execute(delete(Appointment).where(Appointment.id.in_(ids), condition),
+                           execution_options={'synchronize_session': False})
+        _audit_deletes('appointment', before)
+        changes.record(db.session, 'appointment', ids, action='delete')
+    if close_day:
+        db.session.add(ScheduleException(doctor_id=doctor_id, start_date=day, end_date=day, reason=reason))
+    db.session.commit()
+    return ids
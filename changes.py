@@ -0,0 +1,151 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, func, insert
+
+from fragments import CHANGED_TABLES_KEY, fragment_cache
+from models import db, ChangeEntry
+from principals import principal_cache
+from routing import RoutingSession
+
+# Logs and tables derived from others, not part of the feed
+UNTRACKED_TABLES = ('change_log', 'audit_log', 'prescription_rollup')
+
+
+def _entries(table, row_ids, action):
+    now = datetime.utcnow()
+    return [{'table_name': table, 'row_id': row_id, 'action': action, 'changed_at': now} for row_id in row_ids]
+
+
+def record(db_session, table, row_ids, action='update'):
+    """Add changes made outside the unit of work (bulk UPDATE/DELETE) to the feed, in the current transaction.
+
+    The commit then invalidates this process's caches of the table as well.
+    """
+    entries = _entries(table, row_ids, action)
+    if entries:
+        db_session.connection().execute(insert(ChangeEntry), entries)
+        db_session.info.setdefault(CHANGED_TABLES_KEY, set()).add(table)
+
+
+def _log_changes(db_session, flush_context):
+    # Written in the flushing transaction, so the feed commits or rolls back with the change
+    entries = []
+    for action, objects in (('insert', db_session.new), ('update', db_session.dirty),
+                            ('delete', db_session.deleted)):
+        for obj in objects:
+            table = getattr(obj, '__tablename__', None)
+            if table is None or table in UNTRACKED_TABLES:
+                continue
+            if action == 'update' and not db_session.is_modified(obj, include_collections=False):
+                continue
+            entries.extend(_entries(table, [obj.id], action))
+    if entries:
+        db_session.connection().execute(insert(ChangeEntry), entries)
+
+
+event.listen(RoutingSession, 'after_flush', _log_changes)
+
+
+def read_changes(since, limit, tables=None, settle_seconds=0):
+    """Up to ``limit`` changes after seq ``since``, oldest first.
+
+    Returns (entries, next cursor, more waiting). The next cursor moves past
+    entries that ``tables`` filtered out. Entries younger than
+    ``settle_seconds`` are held back, so a transaction that committed late
+    with a lower seq is not skipped.
+    """
+    newest = db.select(func.max(ChangeEntry.seq))
+    if settle_seconds:
+        newest = newest.where(ChangeEntry.changed_at <= datetime.utcnow() - timedelta(seconds=settle_seconds))
+    high = db.session.scalar(newest) or since
+
+    query = db.select(ChangeEntry).where(ChangeEntry.seq > since, ChangeEntry.seq <= high)
+    if tables:
+        query = query.where(ChangeEntry.table_name.in_(tables))
+    entries = db.session.scalars(query.order_by(ChangeEntry.seq).limit(limit + 1)).all()
+    if len(entries) > limit:
+        return entries[:limit], entries[limit - 1].seq, True
+    return entries, max(high, since), False
+
+
+def cursor_expired(since):
+    """Whether entries after ``since`` have been pruned, so the consumer must resync"""
+    if not since:
+        return False
+    oldest = db.session.scalar(db.select(func.min(ChangeEntry.seq)))
+    return oldest is not None and since < oldest - 1
+
+
+def prune(before):
+    """Delete entries older than ``before``; returns how many.
+
+    The newest entry is always kept, so cursor_expired() can still tell
+    which cursors fell behind.
+    """
+    newest = db.select(func.max(ChangeEntry.seq)).scalar_subquery()
+    result = db.session.execute(delete(ChangeEntry).where(ChangeEntry.changed_at < before, ChangeEntry.seq < newest))
+    db.session.commit()
+    return result.rowcount
+
+
+class ChangeFollower:
+    """Invalidates this process's caches for tables that other processes changed.
+
+    At most once per ``interval`` seconds, a request reads which tables
+    have entries in the feed past the last seq seen and bumps their
+    fragment cache generations. Changed users and doctors are also dropped
+    from the principal cache, so a deleted account stops working in every
+    process rather than when its cached principal expires.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.last_seq = None
+        self._next_poll = 0
+        self._lock = threading.Lock()
+
+    def poll(self):
+        if time.monotonic() < self._next_poll or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_poll = time.monotonic() + self.interval
+            if self.last_seq is None:
+                # Everything up to now is already reflected in the empty caches
+                self.last_seq = db.session.scalar(db.select(func.max(ChangeEntry.seq))) or 0
+                return
+            changed = db.session.execute(
+                db.select(ChangeEntry.table_name, func.max(ChangeEntry.seq))
+                .where(ChangeEntry.seq > self.last_seq)
+                .group_by(ChangeEntry.table_name)).all()
+            if changed:
+                tables = [table for table, _ in changed]
+                seq = max(seq for _, seq in changed)
+                fragment_cache().bump(tables)
+                if 'user' in tables or 'doctor' in tables:
+                    self._invalidate_principals(seq)
+                self.last_seq = seq
+        finally:
+            self._lock.release()
+
+    def _invalidate_principals(self, up_to):
+        rows = db.session.execute(
+            db.select(ChangeEntry.table_name, ChangeEntry.row_id).distinct()
+            .where(ChangeEntry.seq > self.last_seq, ChangeEntry.seq <= up_to,
+                   ChangeEntry.table_name.in_(('user', 'doctor')))).all()
+        cache = principal_cache()
+        for table, row_id in rows:
+            if table == 'user':
+                cache.invalidate_user(row_id)
+            else:
+                cache.invalidate_doctor(row_id)
+
+
+def init_changes(app):
+    interval = app.config['CHANGE_FEED_POLL_MS']
+    if not interval:
+        return
+    follower = ChangeFollower(interval / 1000)
+    app.extensions['change_follower'] = follower
+    app.before_request(follower.poll)
@@ -0,0 +1,36 @@
+import gzip
+
+from flask import current_app, request
+
+# Only text responses are worth compressing on the fly
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'application/json', 'application/javascript',
+}
+
+
+def compress_response(response):
+    """gzip dynamic HTML/JSON responses above COMPRESS_MIN_SIZE when the client accepts it"""
+    if (response.status_code < 200 or response.status_code >= 300
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or not request.accept_encodings['gzip']):
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    response.set_data(gzip.compress(data, current_app.config['COMPRESS_LEVEL']))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    # The body differs from the uncompressed one, so the validator can only be weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    if app.config['COMPRESS_MIN_SIZE'] > 0:
+        app.after_request(compress_response)
@@ -0,0 +1,127 @@
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'Villo')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///hospital.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Database engine profile: 'sqlite' (tuned PRAGMAs), 'server' (pooled
+    # PostgreSQL/MySQL) or 'auto' to pick from the database URL
+    DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'auto')
+
+    # Tuned SQLite profile, applied to every new connection
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')  # safe with WAL
+    SQLITE_BUSY_TIMEOUT_MS = _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)  # wait for locks instead of failing
+    SQLITE_CACHE_SIZE_KB = _env_int('SQLITE_CACHE_SIZE_KB', 20000)
+    SQLITE_MMAP_SIZE = _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+
+    # Read routing: read-only GET views use a separate read engine. On SQLite
+    # (WAL) that is a pool of query_only connections to the same file; on a
+    # server database set DATABASE_READ_URL to a replica.
+    DATABASE_READ_URL = os.environ.get('DATABASE_READ_URL')
+    DATABASE_READ_POOL_SIZE = _env_int('DATABASE_READ_POOL_SIZE', 5)  # 0 disables read routing on SQLite
+    READ_YOUR_WRITES_SECONDS = _env_int('READ_YOUR_WRITES_SECONDS', 5)
+
+    # Server database profile connection pool
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 10)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 20)
+    DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 30)  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = _env_int('DB_POOL_RECYCLE', 1800)  # seconds before a connection is replaced
+    DB_POOL_PRE_PING = _env_bool('DB_POOL_PRE_PING', True)
+
+    # Password hashing. Changing the method rehashes each user's password on
+    # their next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = _env_int('PASSWORD_HASH_WORKERS', 4)  # hashes running at once
+    PASSWORD_HASH_MAX_QUEUE = _env_int('PASSWORD_HASH_MAX_QUEUE', 32)  # logins waiting before we shed load
+    PASSWORD_HASH_TIMEOUT = _env_int('PASSWORD_HASH_TIMEOUT', 10)  # seconds
+
+    # Logged-in user principals are cached per process for this many seconds
+    PRINCIPAL_CACHE_TTL = _env_int('PRINCIPAL_CACHE_TTL', 60)
+    PRINCIPAL_CACHE_SIZE = 10000
+
+    # Medical record storage
+    RECORD_STORAGE_CODEC = os.environ.get('RECORD_STORAGE_CODEC', 'none')  # none, gzip or zstd
+    RECORD_COMPRESSION_MAX_RATIO = 0.9  # keep compressed copy only if it saves at least 10%
+
+    # Rendered template fragments (dropdown option lists, modal bodies) are
+    # cached per process and dropped whenever a table they read from changes
+    FRAGMENT_CACHE_TTL = _env_int('FRAGMENT_CACHE_TTL', 300)
+    FRAGMENT_CACHE_SIZE = 2000
+    # Compiled Jinja templates are kept here between restarts; defaults to
+    # <instance>/jinja-cache, set to an empty string to disable
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+
+    # Static assets are served from /assets/ under content-hashed names and
+    # cached for a year. `flask assets-build` writes the fingerprinted copies
+    # plus gzip/brotli variants to ASSET_BUILD_DIR (default static/dist).
+    ASSET_BUILD_DIR = os.environ.get('ASSET_BUILD_DIR')
+    STATIC_MAX_AGE = 365 * 24 * 3600
+    # Dynamic HTML/JSON responses larger than this many bytes are gzipped (0 disables)
+    COMPRESS_MIN_SIZE = _env_int('COMPRESS_MIN_SIZE', 1024)
+    COMPRESS_LEVEL = 6
+
+    # Utilization reports are cached per date range until appointments,
+    # doctors or schedules change; longer ranges than this are refused
+    ANALYTICS_CACHE_TTL = _env_int('ANALYTICS_CACHE_TTL', 600)
+    ANALYTICS_CACHE_SIZE = 256
+    ANALYTICS_MAX_RANGE_DAYS = _env_int('ANALYTICS_MAX_RANGE_DAYS', 3 * 366)
+
+    # Doctors' weekly hours and leave are compiled into per-day minute masks,
+    # rebuilt when a schedule changes and at least this often (seconds)
+    SCHEDULE_CACHE_TTL = _env_int('SCHEDULE_CACHE_TTL', 60)
+
+    # Changes to patients, appointments, prescriptions and medical records are
+    # queued at commit and written to audit_log in batches by a background thread
+    AUDIT_LOG = _env_bool('AUDIT_LOG', True)
+    AUDIT_QUEUE_SIZE = _env_int('AUDIT_QUEUE_SIZE', 10000)  # entries waiting before committers have to wait
+    AUDIT_BATCH_SIZE = 500
+    AUDIT_FLUSH_INTERVAL_MS = _env_int('AUDIT_FLUSH_INTERVAL_MS', 200)  # longest wait to fill a batch
+    AUDIT_ENQUEUE_TIMEOUT_MS = _env_int('AUDIT_ENQUEUE_TIMEOUT_MS', 2000)  # then the committer writes it itself
+
+    # Every insert, update and delete is numbered in change_log for /api/v1/changes.
+    # Each process reads it this often to drop caches other processes made stale
+    # (0 turns that off). On a server database with concurrent writers, hold
+    # back entries for a few seconds so a late commit with a lower seq isn't skipped.
+    CHANGE_FEED_POLL_MS = _env_int('CHANGE_FEED_POLL_MS', 1000)
+    CHANGE_FEED_SETTLE_SECONDS = _env_int('CHANGE_FEED_SETTLE_SECONDS', 0)
+    CHANGE_FEED_MAX_LIMIT = 1000
+
+    # Live schedule streams (server-sent events) on the doctor pages, at most
+    # LIVE_MAX_STREAMS per process. Left at 0 it follows the worker: gevent
+    # workers (the default when gevent is installed) take LIVE_MAX_STREAMS_GEVENT,
+    # threaded ones GUNICORN_THREADS less LIVE_RESERVED_THREADS for other requests.
+    # Streams end after LIVE_STREAM_SECONDS and browsers reconnect.
+    LIVE_MAX_STREAMS = _env_int('LIVE_MAX_STREAMS', 0)
+    LIVE_MAX_STREAMS_GEVENT = 500
+    LIVE_RESERVED_THREADS = _env_int('LIVE_RESERVED_THREADS', 2)
+    GUNICORN_THREADS = _env_int('GUNICORN_THREADS', 4)  # as in gunicorn.conf.py
+    LIVE_POLL_MS = _env_int('LIVE_POLL_MS', 1000)
+    LIVE_STREAM_SECONDS = _env_int('LIVE_STREAM_SECONDS', 300)
+    LIVE_HEARTBEAT_SECONDS = 15
+    LIVE_QUEUE_SIZE = 100  # events a slow stream may fall behind before it's reset
+
+    # Appointments and prescriptions dated more than ARCHIVE_AFTER_DAYS ago are
+    # moved to archive tables by `flask archive`, a batch per transaction
+    ARCHIVE_AFTER_DAYS = _env_int('ARCHIVE_AFTER_DAYS', 730)
+    ARCHIVE_BATCH_SIZE = _env_int('ARCHIVE_BATCH_SIZE', 500)
+    ARCHIVE_PAUSE_MS = 50  # between batches, so other writers get the lock
+
+    # `flask backup` copies the live SQLite database in steps of this many pages,
+    # pausing between them so writers aren't blocked, plus any record files not
+    # yet in BACKUP_DIR (default <instance>/backups)
+    BACKUP_DIR = os.environ.get('BACKUP_DIR')
+    BACKUP_PAGES_PER_STEP = _env_int('BACKUP_PAGES_PER_STEP', 256)
+    BACKUP_STEP_SLEEP_MS = _env_int('BACKUP_STEP_SLEEP_MS', 10)
+    BACKUP_MAX_RESTARTS = _env_int('BACKUP_MAX_RESTARTS', 5)  # then the database is copied in one step
@@ -0,0 +1,92 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+from models import db
+
+PROFILES = ('sqlite', 'server')
+
+
+def resolve_profile(config):
+    """Pick the engine profile from config, falling back to the database URL"""
+    profile = config.get('DATABASE_PROFILE', 'auto')
+    if profile == 'auto':
+        url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+        profile = 'sqlite' if url.get_backend_name() == 'sqlite' else 'server'
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE {profile!r}, expected one of {', '.join(PROFILES)}")
+    return profile
+
+
+def sqlite_pragmas(config):
+    return {
+        'journal_mode': config['SQLITE_JOURNAL_MODE'],
+        'synchronous': config['SQLITE_SYNCHRONOUS'],
+        'busy_timeout': config['SQLITE_BUSY_TIMEOUT_MS'],
+        'cache_size': -config['SQLITE_CACHE_SIZE_KB'],  # negative means KiB rather than pages
+        'mmap_size': config['SQLITE_MMAP_SIZE'],
+        'temp_store': 'MEMORY',
+    }
+
+
+def server_engine_options(config):
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+def apply_pragmas(engine, pragmas):
+    """Run the given PRAGMAs on every new connection the engine opens"""
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def _is_file_database(url):
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def create_read_engine(config, profile, primary):
+    """Build the engine read-only views are routed to, or None to read from the primary"""
+    if config.get('DATABASE_READ_URL'):
+        url = make_url(config['DATABASE_READ_URL'])
+        if url.get_backend_name() == 'sqlite':
+            engine = create_engine(url)
+            apply_pragmas(engine, {**sqlite_pragmas(config), 'query_only': 'ON'})
+            return engine
+        return create_engine(url, **server_engine_options(config))
+
+    # WAL lets readers run alongside the single writer, so a pool of
+    # query_only connections to the same file can serve the GET pages
+    if (profile == 'sqlite' and config['DATABASE_READ_POOL_SIZE'] > 0
+            and config['SQLITE_JOURNAL_MODE'].upper() == 'WAL' and _is_file_database(primary.url)):
+        engine = create_engine(primary.url, pool_size=config['DATABASE_READ_POOL_SIZE'], max_overflow=0)
+        apply_pragmas(engine, {**sqlite_pragmas(config), 'query_only': 'ON'})
+        return engine
+    return None
+
+
+def init_db(app):
+    """Initialise Flask-SQLAlchemy with the configured engine profile"""
+    profile = resolve_profile(app.config)
+    app.config['DATABASE_PROFILE'] = profile
+
+    engine_options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    if profile == 'server':
+        for key, value in server_engine_options(app.config).items():
+            engine_options.setdefault(key, value)
+
+    db.init_app(app)
+
+    with app.app_context():
+        if profile == 'sqlite':
+            apply_pragmas(db.engine, sqlite_pragmas(app.config))
+        read_engine = create_read_engine(app.config, profile, db.engine)
+    if read_engine is not None:
+        app.extensions['db_read_engine'] = read_engine
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+
+from flask import current_app, has_app_context, render_template
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+from sqlalchemy import event
+
+from models import db, Doctor
+from routing import RoutingSession
+
+# Session.info key collecting the tables touched by the current transaction
+CHANGED_TABLES_KEY = 'fragment_changed_tables'
+
+
+class FragmentCache:
+    """Per-process cache of rendered HTML fragments.
+
+    Every entry is keyed by its name plus the current generation of each
+    table it was rendered from. Committing a change to a table bumps that
+    table's generation, so stale entries are simply never looked up again.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, name, tables):
+        return (name,) + tuple(self._generations.get(table, 0) for table in tables)
+
+    def get_or_render(self, name, tables, render):
+        now = time.monotonic()
+        with self._lock:
+            key = self._key(name, tables)
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        html = Markup(render())
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._entries.clear()
+            # Only store it if nothing was committed while rendering
+            if self._key(name, tables) == key:
+                self._entries[key] = (now + self.ttl, html)
+        return html
+
+    def generations(self, tables):
+        """The current generation of each table, for caches built on the same invalidation"""
+        with self._lock:
+            return tuple(self._generations.get(table, 0) for table in tables)
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def _collect_changed_tables(db_session, flush_context):
+    # Still the pre-flush state here, so new/dirty/deleted are populated
+    tables = db_session.info.setdefault(CHANGED_TABLES_KEY, set())
+    for obj in list(db_session.new) + list(db_session.dirty) + list(db_session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table is not None:
+            tables.add(table)
+
+
+def _bump_changed_tables(db_session):
+    tables = db_session.info.pop(CHANGED_TABLES_KEY, None)
+    if tables and has_app_context():
+        fragment_cache().bump(tables)
+
+
+def _forget_changed_tables(db_session):
+    db_session.info.pop(CHANGED_TABLES_KEY, None)
+
+
+event.listen(RoutingSession, 'after_flush', _collect_changed_tables)
+event.listen(RoutingSession, 'after_commit', _bump_changed_tables)
+event.listen(RoutingSession, 'after_rollback', _forget_changed_tables)
+
+
+def invalidate_tables(*tables):
+    """Bump tables changed outside the ORM unit of work (bulk UPDATE/DELETE)"""
+    fragment_cache().bump(tables)
+
+
+def _render_options(template, query):
+    return render_template(template, rows=query.all())
+
+
+def doctor_options():
+    """<option> elements for every doctor, ordered by name"""
+    return fragment_cache().get_or_render('doctor_options', ('doctor',), lambda: _render_options(
+        'fragments/doctor_options.html',
+        db.session.query(Doctor.id, Doctor.first_name, Doctor.surname, Doctor.specialization)
+        .order_by(Doctor.first_name, Doctor.surname)))
+
+
+def bytecode_cache_dir(app):
+    directory = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if directory is None:
+        directory = os.path.join(app.instance_path, 'jinja-cache')
+    return directory
+
+
+def init_fragments(app):
+    app.extensions['fragment_cache'] = FragmentCache(app.config['FRAGMENT_CACHE_TTL'],
+                                                     app.config['FRAGMENT_CACHE_SIZE'])
+    app.jinja_env.globals.update(doctor_options=doctor_options)
+
+    # Skip recompiling every template on each worker start
+    directory = bytecode_cache_dir(app)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+def fragment_cache():
+    return current_app.extensions['fragment_cache']
@@ -0,0 +1,24 @@
+import importlib.util
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+# Processes x threads. Threads suit this app: requests mostly wait on the
+# database and on file I/O. Keep workers modest with SQLite (one writer).
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+# Live schedule streams stay open, so with gevent installed each costs a
+# greenlet instead of one of the threads (see LIVE_MAX_STREAMS)
+default_worker_class = 'gevent' if importlib.util.find_spec('gevent') else 'gthread'
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', default_worker_class)
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Each worker builds its own app (and engine pool) after forking
+preload_app = False
+max_requests = 1000
+max_requests_jitter = 100
+accesslog = '-'
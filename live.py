@@ -0,0 +1,232 @@
+import json
+import queue
+import sys
+import threading
+import time
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import func
+
+import read_models
+from models import db, Appointment, ChangeEntry
+
+
+def _payload(row):
+    return {
+        'id': row.id, 'date': row.date.isoformat(),
+        'start_time': row.start_time.strftime('%H:%M'), 'end_time': row.end_time.strftime('%H:%M'),
+        'patient': f'{row.patient.first_name} {row.patient.surname}', 'diagnosis': row.diagnosis or '',
+    }
+
+
+def _today_rows(ids=None):
+    query = read_models.appointment_select().where(Appointment.date == date.today())
+    if ids is not None:
+        query = query.where(Appointment.id.in_(ids))
+    rows = read_models.fetch(query.order_by(Appointment.start_time), read_models.AppointmentRow)
+    return {row.id: (row.doctor.id, _payload(row)) for row in rows}
+
+
+def format_event(name, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {name}', f'data: {json.dumps(data)}']
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscription:
+    """One open stream: the doctor it follows and its queue of (event, data, id) tuples"""
+
+    def __init__(self, doctor_id, max_queue):
+        self.doctor_id = doctor_id
+        self.queue = queue.Queue(max_queue)
+
+    def put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # A client this far behind reloads the page instead of replaying events
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.queue.put_nowait(('reset', {}, item[2]))
+
+
+class ScheduleBroker:
+    """Pushes changes to today's appointments to the doctors' open streams.
+
+    One thread per process follows change_log while anyone is subscribed,
+    re-reads only the appointments that changed and compares them with its
+    snapshot of today's schedule to tell created, changed and cancelled
+    apart. Streams just wait on their own queue, so each open stream costs
+    a queue rather than a database query per poll.
+    """
+
+    def __init__(self, app, interval, max_streams, max_queue):
+        self.app = app
+        self.interval = interval
+        self.max_streams = max_streams
+        self.max_queue = max_queue
+        self._subscriptions = {}  # doctor id -> set of Subscriptions
+        self._stream_count = 0
+        self._snapshot = {}  # appointment id -> (doctor id, payload)
+        self._day = None
+        self._last_seq = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        # Held while reading the database into the snapshot, so a reload and a poll never interleave
+        self._refresh = threading.Lock()
+
+    def subscribe(self, doctor_id):
+        """A new Subscription and the doctor's appointments today, or None when the process is at max_streams"""
+        with self._lock:
+            if self._stream_count >= self.max_streams:
+                return None
+            # Nobody followed the log while idle, so the snapshot may be stale
+            stale = self._stream_count == 0 or self._day != date.today()
+            subscription = Subscription(doctor_id, self.max_queue)
+            self._subscriptions.setdefault(doctor_id, set()).add(subscription)
+            self._stream_count += 1
+            self._wake.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='schedule-broker', daemon=True)
+                self._thread.start()
+        if stale:
+            with self.app.app_context():
+                self._reload()
+        with self._lock:
+            schedule = [payload for owner, payload in self._snapshot.values() if owner == doctor_id]
+        return subscription, sorted(schedule, key=lambda payload: payload['start_time'])
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.doctor_id, set())
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+                self._stream_count -= 1
+                if not subscriptions:
+                    del self._subscriptions[subscription.doctor_id]
+
+    def stream_count(self):
+        with self._lock:
+            return self._stream_count
+
+    def _reload(self):
+        with self._refresh:
+            # The seq first: anything committed after it is re-read on the next poll anyway
+            last_seq = db.session.scalar(db.select(func.max(ChangeEntry.seq))) or 0
+            snapshot = _today_rows()
+            with self._lock:
+                # Streams opened on another day start over
+                resync = self._day not in (None, date.today())
+                self._snapshot, self._day = snapshot, date.today()
+                self._last_seq = max(self._last_seq or 0, last_seq)
+                if resync:
+                    for subscriptions in self._subscriptions.values():
+                        for subscription in subscriptions:
+                            subscription.put(('reset', {}, self._last_seq))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._subscriptions:
+                    self._wake.wait()
+            try:
+                with self.app.app_context():
+                    if self._day != date.today():
+                        self._reload()
+                    else:
+                        self._poll()
+            except Exception:
+                self.app.logger.exception('Live schedule poll failed')
+            time.sleep(self.interval)
+
+    def _poll(self):
+        with self._refresh:
+            self._apply_changes()
+
+    def _apply_changes(self):
+        # _last_seq only moves under _refresh, which the caller holds
+        changed = db.session.execute(
+            db.select(ChangeEntry.row_id, ChangeEntry.seq)
+            .where(ChangeEntry.seq > self._last_seq, ChangeEntry.table_name == 'appointment')).all()
+        if not changed:
+            return
+        seq = max(seq for _, seq in changed)
+        ids = {row_id for row_id, _ in changed}
+        current = _today_rows(ids)
+
+        events = []
+        with self._lock:
+            for appointment_id in ids:
+                before, after = self._snapshot.get(appointment_id), current.get(appointment_id)
+                if before == after:
+                    continue
+                # Moving to another doctor or day cancels it for the old doctor
+                if before and (after is None or after[0] != before[0]):
+                    events.append((before[0], 'cancelled', {'id': appointment_id}))
+                    before = None
+                if after:
+                    events.append((after[0], 'created' if before is None else 'changed', after[1]))
+                    self._snapshot[appointment_id] = after
+                else:
+                    self._snapshot.pop(appointment_id, None)
+            for doctor_id, name, data in events:
+                for subscription in self._subscriptions.get(doctor_id, ()):
+                    subscription.put((name, data, seq))
+            self._last_seq = seq
+
+
+def stream(broker, subscription, schedule, max_seconds, heartbeat, retry_ms):
+    """The text/event-stream body: the schedule so far, then changes as they come.
+
+    Ends after ``max_seconds`` so the browser reconnects, which spreads
+    long-lived streams over workers and frees their threads.
+    """
+    try:
+        yield f'retry: {retry_ms}\n\n'
+        yield format_event('snapshot', schedule)
+        deadline = time.monotonic() + max_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                name, data, event_id = subscription.queue.get(timeout=min(heartbeat, remaining))
+            except queue.Empty:
+                yield ': keepalive\n\n'  # also how a closed connection is noticed
+                continue
+            yield format_event(name, data, event_id)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def _gevent_patched():
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+
+def max_streams(config):
+    """LIVE_MAX_STREAMS, or when unset, what this process's workers can hold open.
+
+    A gevent worker spends a greenlet per stream; a threaded worker a whole
+    thread, so LIVE_RESERVED_THREADS are kept back for ordinary requests.
+    """
+    if config['LIVE_MAX_STREAMS']:
+        return config['LIVE_MAX_STREAMS']
+    if _gevent_patched():
+        return config['LIVE_MAX_STREAMS_GEVENT']
+    return max(config['GUNICORN_THREADS'] - config['LIVE_RESERVED_THREADS'], 1)
+
+
+def init_live(app):
+    app.extensions['schedule_broker'] = ScheduleBroker(app, app.config['LIVE_POLL_MS'] / 1000,
+                                                       max_streams(app.config),
+                                                       app.config['LIVE_QUEUE_SIZE'])
+
+
+def schedule_broker():
+    return current_app.extensions['schedule_broker']
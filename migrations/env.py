@@ -3,6 +3,7 @@ from logging.config import fileConfig
 
 from flask import current_app
 
+import sqlalchemy as sa
 from alembic import context
 
 # this is the Alembic Config object, which provides
@@ -51,6 +52,31 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # The full-text index (and SQLite's shadow tables for it) is created by
+    # its migration and has no model, so autogenerate must not drop it
+    return not (type_ == 'table' and name.startswith('medical_record_fts'))
+
+
+# The first revision converts the appointment.time column of the original
+# schema. Databases without a version yet were made by db.create_all() (or
+# are empty), so that change doesn't apply and they start after it.
+FIRST_REVISION = 'b3f6fabb3100'
+
+
+def stamp_unversioned(connection, migration_context):
+    # Only when upgrading; `flask db current` and the like leave the database alone
+    if getattr(migration_context.opts.get('fn'), '__name__', None) != 'upgrade':
+        return
+    inspector = sa.inspect(connection)
+    tables = inspector.get_table_names()
+    if 'alembic_version' in tables:
+        return
+    if 'appointment' in tables and 'time' in {column['name'] for column in inspector.get_columns('appointment')}:
+        return
+    migration_context.stamp(context.script, FIRST_REVISION)
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +91,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -100,10 +127,12 @@ def run_migrations_online():
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
+            include_object=include_object,
             **conf_args
         )
 
         with context.begin_transaction():
+            stamp_unversioned(connection, context.get_context())
             context.run_migrations()
 
 
@@ -0,0 +1,108 @@
+"""create the base tables
+
+Revision ID: 0a7c3e5d1b92
+Revises: b3f6fabb3100
+Create Date: 2026-10-20 10:00:00.000000
+
+The schema used to be created by ``db.create_all()`` at startup. This
+creates the base tables a new database doesn't have yet, skipping any that
+an existing one already has.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a7c3e5d1b92'
+down_revision = 'b3f6fabb3100'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'patient' not in existing_tables:
+        op.create_table('patient',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('first_name', sa.String(length=50), nullable=False),
+            sa.Column('surname', sa.String(length=50), nullable=False),
+            sa.Column('date_of_birth', sa.Date(), nullable=False),
+            sa.Column('gender', sa.String(length=10), nullable=True),
+            sa.Column('phone', sa.String(length=15), nullable=True),
+            sa.Column('date_created', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'doctor' not in existing_tables:
+        op.create_table('doctor',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('first_name', sa.String(length=50), nullable=False),
+            sa.Column('surname', sa.String(length=50), nullable=False),
+            sa.Column('specialization', sa.String(length=50), nullable=True),
+            sa.Column('date_created', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'appointment' not in existing_tables:
+        op.create_table('appointment',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('date', sa.Date(), nullable=False),
+            sa.Column('start_time', sa.Time(), nullable=False),
+            sa.Column('end_time', sa.Time(), nullable=False),
+            sa.Column('diagnosis', sa.Text(), nullable=True),
+            sa.Column('date_created', sa.DateTime(), nullable=True),
+            sa.Column('patient_id', sa.Integer(), nullable=False),
+            sa.Column('doctor_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+            sa.ForeignKeyConstraint(['patient_id'], ['patient.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'prescription' not in existing_tables:
+        op.create_table('prescription',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('medication_name', sa.String(length=100), nullable=False),
+            sa.Column('dosage', sa.String(length=50), nullable=False),
+            sa.Column('frequency', sa.String(length=50), nullable=False),
+            sa.Column('duration', sa.String(length=50), nullable=False),
+            sa.Column('instructions', sa.Text(), nullable=True),
+            sa.Column('date_prescribed', sa.Date(), nullable=False),
+            sa.Column('date_created', sa.DateTime(), nullable=True),
+            sa.Column('patient_id', sa.Integer(), nullable=False),
+            sa.Column('doctor_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+            sa.ForeignKeyConstraint(['patient_id'], ['patient.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'medical_record' not in existing_tables:
+        op.create_table('medical_record',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('patient_id', sa.Integer(), nullable=False),
+            sa.Column('doctor_id', sa.Integer(), nullable=False),
+            sa.Column('record_type', sa.String(length=100), nullable=False),
+            sa.Column('file_name', sa.String(length=255), nullable=False),
+            sa.Column('file_path', sa.String(length=500), nullable=False),
+            sa.Column('file_size', sa.Integer(), nullable=True),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('upload_date', sa.DateTime(), nullable=True),
+            sa.Column('date_created', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+            sa.ForeignKeyConstraint(['patient_id'], ['patient.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'user' not in existing_tables:
+        op.create_table('user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=100), nullable=False),
+            sa.Column('password_hash', sa.String(length=200), nullable=False),
+            sa.Column('doctor_id', sa.Integer(), nullable=True),
+            sa.Column('is_admin', sa.Boolean(), nullable=True),
+            sa.Column('date_created', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('username')
+        )
+
+
+def downgrade():
+    # These tables may hold every patient's records, and databases that had
+    # them before this revision ran still need them; they are left in place
+    pass
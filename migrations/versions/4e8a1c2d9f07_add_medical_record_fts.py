@@ -0,0 +1,31 @@
+"""add full-text index of medical record contents
+
+Revision ID: 4e8a1c2d9f07
+Revises: 0a7c3e5d1b92
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8a1c2d9f07'
+down_revision = '0a7c3e5d1b92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite only; other databases fall back to metadata search
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS medical_record_fts "
+        "USING fts5(content, tokenize='unicode61')"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TABLE IF EXISTS medical_record_fts")
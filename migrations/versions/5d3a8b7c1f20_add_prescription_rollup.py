@@ -0,0 +1,52 @@
+"""add prescription rollup table
+
+Revision ID: 5d3a8b7c1f20
+Revises: a91d3f6c2e58
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from collections import Counter
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d3a8b7c1f20'
+down_revision = 'a91d3f6c2e58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    rollup = op.create_table('prescription_rollup',
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('medication_name', sa.String(length=100), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('prescription_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('month', 'medication_name', 'doctor_id')
+    )
+    op.create_index('ix_prescription_rollup_doctor_id', 'prescription_rollup', ['doctor_id'], unique=False)
+
+    # Count the existing prescriptions
+    bind = op.get_bind()
+    prescription = sa.table('prescription', sa.column('date_prescribed', sa.Date),
+                            sa.column('medication_name', sa.String), sa.column('doctor_id', sa.Integer))
+    counts = Counter()
+    rows = bind.execute(
+        sa.select(prescription.c.date_prescribed, prescription.c.medication_name, prescription.c.doctor_id,
+                  sa.func.count())
+        .group_by(prescription.c.date_prescribed, prescription.c.medication_name, prescription.c.doctor_id)
+    )
+    for date_prescribed, medication_name, doctor_id, count in rows:
+        counts[(date_prescribed.replace(day=1), medication_name, doctor_id)] += count
+    if counts:
+        bind.execute(rollup.insert(), [
+            {'month': month, 'medication_name': medication_name, 'doctor_id': doctor_id, 'prescription_count': count}
+            for (month, medication_name, doctor_id), count in counts.items()
+        ])
+
+
+def downgrade():
+    op.drop_index('ix_prescription_rollup_doctor_id', table_name='prescription_rollup')
+    op.drop_table('prescription_rollup')
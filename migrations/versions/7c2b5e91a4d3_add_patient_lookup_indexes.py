@@ -0,0 +1,47 @@
+"""add patient lookup indexes for the typeahead
+
+Revision ID: 7c2b5e91a4d3
+Revises: 4e8a1c2d9f07
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2b5e91a4d3'
+down_revision = '4e8a1c2d9f07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('phone_digits', sa.String(length=15), nullable=True))
+        batch_op.create_index('ix_patient_phone_digits', ['phone_digits'], unique=False)
+
+    op.create_index('ix_patient_first_name_lower', 'patient', [sa.text('lower(first_name)')], unique=False)
+    op.create_index('ix_patient_surname_lower', 'patient', [sa.text('lower(surname)')], unique=False)
+
+    # Backfill the normalized phone numbers of existing patients
+    bind = op.get_bind()
+    patient = sa.table('patient', sa.column('id', sa.Integer), sa.column('phone', sa.String),
+                       sa.column('phone_digits', sa.String))
+    rows = bind.execute(sa.select(patient.c.id, patient.c.phone).where(patient.c.phone.isnot(None))).fetchall()
+    updates = [{'patient_id': row.id, 'digits': re.sub(r'\D', '', row.phone) or None} for row in rows]
+    if updates:
+        bind.execute(
+            patient.update().where(patient.c.id == sa.bindparam('patient_id')).values(phone_digits=sa.bindparam('digits')),
+            updates
+        )
+
+
+def downgrade():
+    op.drop_index('ix_patient_surname_lower', table_name='patient')
+    op.drop_index('ix_patient_first_name_lower', table_name='patient')
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.drop_index('ix_patient_phone_digits')
+        batch_op.drop_column('phone_digits')
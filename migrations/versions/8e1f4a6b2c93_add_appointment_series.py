@@ -0,0 +1,49 @@
+"""add recurring appointment series
+
+Revision ID: 8e1f4a6b2c93
+Revises: 5d3a8b7c1f20
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e1f4a6b2c93'
+down_revision = '5d3a8b7c1f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('appointment_series',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('frequency', sa.String(length=10), nullable=False),
+        sa.Column('interval', sa.Integer(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('date_created', sa.DateTime(), nullable=True),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+        sa.ForeignKeyConstraint(['patient_id'], ['patient.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_appointment_series_patient_id', 'appointment_series', ['patient_id'], unique=False)
+    op.create_index('ix_appointment_series_doctor_id', 'appointment_series', ['doctor_id'], unique=False)
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('series_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_appointment_series_id', ['series_id'], unique=False)
+        batch_op.create_foreign_key('fk_appointment_series_id', 'appointment_series', ['series_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_appointment_series_id', type_='foreignkey')
+        batch_op.drop_index('ix_appointment_series_id')
+        batch_op.drop_column('series_id')
+
+    op.drop_index('ix_appointment_series_doctor_id', table_name='appointment_series')
+    op.drop_index('ix_appointment_series_patient_id', table_name='appointment_series')
+    op.drop_table('appointment_series')
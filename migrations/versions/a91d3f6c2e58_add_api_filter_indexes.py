@@ -0,0 +1,38 @@
+"""add indexes for the columns the API filters on
+
+Revision ID: a91d3f6c2e58
+Revises: 7c2b5e91a4d3
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a91d3f6c2e58'
+down_revision = '7c2b5e91a4d3'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_doctor_specialization', 'doctor', ['specialization']),
+    ('ix_appointment_date', 'appointment', ['date']),
+    ('ix_appointment_doctor_id_date', 'appointment', ['doctor_id', 'date']),
+    ('ix_appointment_patient_id_date', 'appointment', ['patient_id', 'date']),
+    ('ix_prescription_patient_id', 'prescription', ['patient_id']),
+    ('ix_prescription_doctor_id', 'prescription', ['doctor_id']),
+    ('ix_prescription_date_prescribed', 'prescription', ['date_prescribed']),
+    ('ix_medical_record_patient_id', 'medical_record', ['patient_id']),
+    ('ix_medical_record_doctor_id', 'medical_record', ['doctor_id']),
+    ('ix_medical_record_record_type', 'medical_record', ['record_type']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,53 @@
+"""add doctor schedule templates and exceptions
+
+Revision ID: b1c7e3d9a4f6
+Revises: 8e1f4a6b2c93
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b1c7e3d9a4f6'
+down_revision = '8e1f4a6b2c93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Doctors without rows here keep the default Monday-Friday 08:00-18:00 hours
+    op.create_table('doctor_schedule',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('weekday', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_doctor_schedule_doctor_id', 'doctor_schedule', ['doctor_id'], unique=False)
+
+    op.create_table('schedule_exception',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=True),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=True),
+        sa.Column('end_time', sa.Time(), nullable=True),
+        sa.Column('reason', sa.String(length=100), nullable=True),
+        sa.Column('date_created', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_schedule_exception_doctor_id', 'schedule_exception', ['doctor_id'], unique=False)
+    op.create_index('ix_schedule_exception_start_date', 'schedule_exception', ['start_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_schedule_exception_start_date', table_name='schedule_exception')
+    op.drop_index('ix_schedule_exception_doctor_id', table_name='schedule_exception')
+    op.drop_table('schedule_exception')
+    op.drop_index('ix_doctor_schedule_doctor_id', table_name='doctor_schedule')
+    op.drop_table('doctor_schedule')
@@ -0,0 +1,49 @@
+"""add append-only audit log
+
+Revision ID: c4d2a9e7f318
+Revises: b1c7e3d9a4f6
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d2a9e7f318'
+down_revision = 'b1c7e3d9a4f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('audit_log',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('username', sa.String(length=100), nullable=True),
+        sa.Column('action', sa.String(length=10), nullable=False),
+        sa.Column('table_name', sa.String(length=50), nullable=False),
+        sa.Column('row_id', sa.Integer(), nullable=True),
+        sa.Column('changes', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_audit_log_occurred_at', 'audit_log', ['occurred_at'], unique=False)
+    op.create_index('ix_audit_log_table_name_row_id', 'audit_log', ['table_name', 'row_id'], unique=False)
+
+    # Refuse edits and deletes of audit rows in the database itself
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in ('UPDATE', 'DELETE'):
+            op.execute(
+                f"CREATE TRIGGER audit_log_no_{statement.lower()} BEFORE {statement} ON audit_log "
+                f"BEGIN SELECT RAISE(ABORT, 'audit_log is append-only'); END"
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS audit_log_no_delete")
+        op.execute("DROP TRIGGER IF EXISTS audit_log_no_update")
+    op.drop_index('ix_audit_log_table_name_row_id', table_name='audit_log')
+    op.drop_index('ix_audit_log_occurred_at', table_name='audit_log')
+    op.drop_table('audit_log')
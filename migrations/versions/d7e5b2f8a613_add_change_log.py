@@ -0,0 +1,34 @@
+"""add change feed log
+
+Revision ID: d7e5b2f8a613
+Revises: c4d2a9e7f318
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e5b2f8a613'
+down_revision = 'c4d2a9e7f318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_log',
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('table_name', sa.String(length=50), nullable=False),
+        sa.Column('row_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=10), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('seq'),
+        sqlite_autoincrement=True
+    )
+    op.create_index('ix_change_log_changed_at', 'change_log', ['changed_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_change_log_changed_at', table_name='change_log')
+    op.drop_table('change_log')
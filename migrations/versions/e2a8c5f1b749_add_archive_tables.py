@@ -0,0 +1,69 @@
+"""add appointment and prescription archive tables
+
+Revision ID: e2a8c5f1b749
+Revises: d7e5b2f8a613
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a8c5f1b749'
+down_revision = 'd7e5b2f8a613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('appointment_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.Column('diagnosis', sa.Text(), nullable=True),
+        sa.Column('date_created', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('series_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+        sa.ForeignKeyConstraint(['patient_id'], ['patient.id'], ),
+        sa.ForeignKeyConstraint(['series_id'], ['appointment_series.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_appointment_archive_date', 'appointment_archive', ['date'], unique=False)
+    op.create_index('ix_appointment_archive_doctor_id', 'appointment_archive', ['doctor_id'], unique=False)
+    op.create_index('ix_appointment_archive_patient_id', 'appointment_archive', ['patient_id'], unique=False)
+
+    op.create_table('prescription_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('medication_name', sa.String(length=100), nullable=False),
+        sa.Column('dosage', sa.String(length=50), nullable=False),
+        sa.Column('frequency', sa.String(length=50), nullable=False),
+        sa.Column('duration', sa.String(length=50), nullable=False),
+        sa.Column('instructions', sa.Text(), nullable=True),
+        sa.Column('date_prescribed', sa.Date(), nullable=False),
+        sa.Column('date_created', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+        sa.ForeignKeyConstraint(['patient_id'], ['patient.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_prescription_archive_date_prescribed', 'prescription_archive', ['date_prescribed'], unique=False)
+    op.create_index('ix_prescription_archive_doctor_id', 'prescription_archive', ['doctor_id'], unique=False)
+    op.create_index('ix_prescription_archive_patient_id', 'prescription_archive', ['patient_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_prescription_archive_patient_id', table_name='prescription_archive')
+    op.drop_index('ix_prescription_archive_doctor_id', table_name='prescription_archive')
+    op.drop_index('ix_prescription_archive_date_prescribed', table_name='prescription_archive')
+    op.drop_table('prescription_archive')
+    op.drop_index('ix_appointment_archive_patient_id', table_name='appointment_archive')
+    op.drop_index('ix_appointment_archive_doctor_id', table_name='appointment_archive')
+    op.drop_index('ix_appointment_archive_date', table_name='appointment_archive')
+    op.drop_table('appointment_archive')
@@ -0,0 +1,44 @@
+"""never reuse appointment and prescription ids
+
+Revision ID: f3b9d6a2c847
+Revises: e2a8c5f1b749
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9d6a2c847'
+down_revision = 'e2a8c5f1b749'
+branch_labels = None
+depends_on = None
+
+# Live table -> its archive, whose ids the live table must not hand out again
+TABLES = {'appointment': 'appointment_archive', 'prescription': 'prescription_archive'}
+
+
+def upgrade():
+    # Other databases never reuse ids; SQLite only does so without AUTOINCREMENT
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, archive in TABLES.items():
+        with op.batch_alter_table(table, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+            pass
+        # Start past every id used so far, including archived rows newer than the live ones
+        op.execute(sa.text('DELETE FROM sqlite_sequence WHERE name = :name').bindparams(name=table))
+        op.execute(sa.text(
+            f'INSERT INTO sqlite_sequence (name, seq) '
+            f'SELECT :name, MAX(COALESCE((SELECT MAX(id) FROM {table}), 0), '
+            f'COALESCE((SELECT MAX(id) FROM {archive}), 0))').bindparams(name=table))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in TABLES:
+        with op.batch_alter_table(table, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+            pass
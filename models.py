@@ -1,11 +1,28 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from datetime import datetime, date
 import os
 from flask import current_app
+import re
+from sqlalchemy import event, func
+from sqlalchemy.orm import validates
+from routing import RoutingSession, remember_write
+from passwords import hash_password, needs_rehash
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+event.listen(RoutingSession, 'after_flush', remember_write)
+
+def normalize_phone(phone):
+    """Digits only, so "+254 712-345" and "254712345" match"""
+    return re.sub(r'\D', '', phone or '') or None
+
+def prefix_match(expression, prefix):
+    """``expression`` starts with ``prefix``, as a range so an index on it can be used"""
+    return (expression >= prefix) & (expression < prefix + '\U0010ffff')
+
+def age_on(born, today):
+    return today.year - born.year - ((today.month, today.day) < (born.month, born.day))
 
 class Patient(db.Model):
     __tablename__ = 'patient'
@@ -16,6 +33,7 @@ class Patient(db.Model):
     date_of_birth = db.Column(db.Date, nullable=False)  # Store date of birth
     gender = db.Column(db.String(10))
     phone = db.Column(db.String(15))
+    phone_digits = db.Column(db.String(15), index=True)  # phone with formatting stripped, for lookups
     date_created = db.Column(db.DateTime, default=datetime.utcnow)  # New field for creation date
     
     # Relationship to Appointment
@@ -23,12 +41,21 @@ class Patient(db.Model):
     # Relationship to Prescription
     prescriptions = db.relationship('Prescription', back_populates='patient')
     
+    __table_args__ = (
+        # Case-insensitive name prefix searches (patient typeahead)
+        db.Index('ix_patient_first_name_lower', func.lower(first_name)),
+        db.Index('ix_patient_surname_lower', func.lower(surname)),
+    )
+    
+    @validates('phone')
+    def _normalize_phone(self, key, phone):
+        self.phone_digits = normalize_phone(phone)
+        return phone
+    
     # Calculate age based on date of birth
     @property
     def age(self):
-        today = date.today()
-        born = self.date_of_birth
-        return today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+        return age_on(self.date_of_birth, date.today())
 
 class Doctor(db.Model):
     __tablename__ = 'doctor'
@@ -36,22 +63,54 @@ class Doctor(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(50), nullable=False)
     surname = db.Column(db.String(50), nullable=False)
-    specialization = db.Column(db.String(50))
+    specialization = db.Column(db.String(50), index=True)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
     # Relationship to Appointment
     appointments = db.relationship('Appointment', back_populates='doctor')
     # Relationship to Prescription
     prescriptions = db.relationship('Prescription', back_populates='doctor')
+    # Weekly hours and leave, removed along with the doctor
+    schedule = db.relationship('DoctorSchedule', back_populates='doctor', cascade='all, delete-orphan',
+                               order_by='(DoctorSchedule.weekday, DoctorSchedule.start_time)')
+    schedule_exceptions = db.relationship('ScheduleException', back_populates='doctor', cascade='all, delete-orphan',
+                                          order_by='ScheduleException.start_date')
     
     @property
     def name(self):
         return f"{self.first_name} {self.surname}"
+
+class DoctorSchedule(db.Model):
+    """One block of a doctor's weekly hours; a day may have several (e.g. either side of lunch)"""
+    __tablename__ = 'doctor_schedule'
+
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False, index=True)
+    weekday = db.Column(db.Integer, nullable=False)  # 0=Monday ... 6=Sunday
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+
+    doctor = db.relationship('Doctor', back_populates='schedule')
+
+class ScheduleException(db.Model):
+    """Leave or a holiday: time off the weekly hours between two dates"""
+    __tablename__ = 'schedule_exception'
+
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=True, index=True)  # None = whole clinic
+    start_date = db.Column(db.Date, nullable=False, index=True)
+    end_date = db.Column(db.Date, nullable=False)
+    start_time = db.Column(db.Time, nullable=True)  # both None = the whole day
+    end_time = db.Column(db.Time, nullable=True)
+    reason = db.Column(db.String(100))
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+
+    doctor = db.relationship('Doctor', back_populates='schedule_exceptions')
     
 class Appointment(db.Model):
     __tablename__ = 'appointment'
 
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.Date, nullable=False)
+    date = db.Column(db.Date, nullable=False, index=True)
     start_time = db.Column(db.Time, nullable=False)  # Changed from time to start_time
     end_time = db.Column(db.Time, nullable=False)    # Added end_time
     diagnosis = db.Column(db.Text, nullable=True)
@@ -59,10 +118,39 @@ class Appointment(db.Model):
 
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
+    series_id = db.Column(db.Integer, db.ForeignKey('appointment_series.id'), nullable=True, index=True)
+
+    __table_args__ = (
+        # A doctor's or patient's schedule by day
+        db.Index('ix_appointment_doctor_id_date', 'doctor_id', 'date'),
+        db.Index('ix_appointment_patient_id_date', 'patient_id', 'date'),
+        # AUTOINCREMENT, so SQLite doesn't hand out the id of an archived row again
+        {'sqlite_autoincrement': True},
+    )
 
     # Relationships
     patient = db.relationship('Patient', back_populates='appointments')
     doctor = db.relationship('Doctor', back_populates='appointments')
+    series = db.relationship('AppointmentSeries', back_populates='appointments')
+
+class AppointmentSeries(db.Model):
+    """A recurring booking; each occurrence is an ordinary appointment pointing back here"""
+    __tablename__ = 'appointment_series'
+
+    id = db.Column(db.Integer, primary_key=True)
+    frequency = db.Column(db.String(10), nullable=False)  # 'weekly' or 'monthly'
+    interval = db.Column(db.Integer, nullable=False, default=1)  # every N weeks/months
+    start_date = db.Column(db.Date, nullable=False)
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False, index=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False, index=True)
+
+    appointments = db.relationship('Appointment', back_populates='series')
+
+    def describe(self):
+        unit = 'week' if self.frequency == 'weekly' else 'month'
+        return f'Every {unit}' if self.interval == 1 else f'Every {self.interval} {unit}s'
 
 class Prescription(db.Model):
     __tablename__ = 'prescription'
@@ -73,23 +161,68 @@ class Prescription(db.Model):
     frequency = db.Column(db.String(50), nullable=False)
     duration = db.Column(db.String(50), nullable=False)
     instructions = db.Column(db.Text)
-    date_prescribed = db.Column(db.Date, nullable=False, default=date.today)
+    date_prescribed = db.Column(db.Date, nullable=False, default=date.today, index=True)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
 
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False, index=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False, index=True)
+
+    # AUTOINCREMENT, so SQLite doesn't hand out the id of an archived row again
+    __table_args__ = {'sqlite_autoincrement': True}
 
     # Relationships
     patient = db.relationship('Patient', back_populates='prescriptions')
     doctor = db.relationship('Doctor', back_populates='prescriptions')
 
+class PrescriptionRollup(db.Model):
+    """Prescription counts per month, medication and doctor, kept current by rollups.py"""
+    __tablename__ = 'prescription_rollup'
+
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    medication_name = db.Column(db.String(100), primary_key=True)
+    doctor_id = db.Column(db.Integer, primary_key=True, index=True)
+    prescription_count = db.Column(db.Integer, nullable=False, default=0)
+
+class ArchivedAppointment(db.Model):
+    """An old appointment moved out of the live table by archive.py, keeping its id"""
+    __tablename__ = 'appointment_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    date = db.Column(db.Date, nullable=False, index=True)
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    diagnosis = db.Column(db.Text, nullable=True)
+    date_created = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False, index=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False, index=True)
+    series_id = db.Column(db.Integer, db.ForeignKey('appointment_series.id'), nullable=True)
+
+class ArchivedPrescription(db.Model):
+    """An old prescription moved out of the live table by archive.py, keeping its id"""
+    __tablename__ = 'prescription_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    medication_name = db.Column(db.String(100), nullable=False)
+    dosage = db.Column(db.String(50), nullable=False)
+    frequency = db.Column(db.String(50), nullable=False)
+    duration = db.Column(db.String(50), nullable=False)
+    instructions = db.Column(db.Text)
+    date_prescribed = db.Column(db.Date, nullable=False, index=True)
+    date_created = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False, index=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False, index=True)
+
 class MedicalRecord(db.Model):
     __tablename__ = 'medical_record'
     
     id = db.Column(db.Integer, primary_key=True)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
-    record_type = db.Column(db.String(100), nullable=False)  # e.g., 'Lab Report', 'X-Ray', 'Prescription', 'Medical History'
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False, index=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False, index=True)
+    record_type = db.Column(db.String(100), nullable=False, index=True)  # e.g., 'Lab Report', 'X-Ray', 'Prescription', 'Medical History'
     file_name = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     file_size = db.Column(db.Integer)  # Size in bytes
@@ -120,6 +253,37 @@ class MedicalRecord(db.Model):
     def can_preview(self):
         return self.is_image() or self.is_pdf()    
 
+class AuditEntry(db.Model):
+    """One change to a clinical record; rows are only ever inserted (see audit.py)"""
+    __tablename__ = 'audit_log'
+
+    id = db.Column(db.Integer, primary_key=True)
+    occurred_at = db.Column(db.DateTime, nullable=False, index=True)
+    user_id = db.Column(db.Integer)  # no foreign key: entries outlive deleted users
+    username = db.Column(db.String(100))
+    action = db.Column(db.String(10), nullable=False)  # 'insert', 'update' or 'delete'
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer)
+    changes = db.Column(db.Text, nullable=False)  # JSON: {field: [before, after]}
+
+    __table_args__ = (
+        # The history of one record
+        db.Index('ix_audit_log_table_name_row_id', 'table_name', 'row_id'),
+    )
+
+class ChangeEntry(db.Model):
+    """One insert, update or delete of a row, in commit order (see changes.py)"""
+    __tablename__ = 'change_log'
+
+    seq = db.Column(db.Integer, primary_key=True)  # the feed cursor; never reused
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # 'insert', 'update', 'delete' or 'archive'
+    changed_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    # AUTOINCREMENT, so SQLite doesn't hand out the seq of a pruned row again
+    __table_args__ = {'sqlite_autoincrement': True}
+
 class User(db.Model, UserMixin):
     __tablename__ = 'user'
 
@@ -134,7 +298,10 @@ class User(db.Model, UserMixin):
     doctor = db.relationship('Doctor', backref=db.backref('user_account', uselist=False))
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
\ No newline at end of file
+        return check_password_hash(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
\ No newline at end of file
@@ -0,0 +1,130 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool's queue is full or a hash takes too long"""
+
+
+@lru_cache(maxsize=None)
+def canonical_method(method):
+    """Expand a method like 'pbkdf2' to the full prefix Werkzeug writes, e.g. 'pbkdf2:sha256:1000000'"""
+    return generate_password_hash('', method=method, salt_length=1).split('$', 1)[0]
+
+
+def hash_password(password):
+    return generate_password_hash(password,
+                                  method=current_app.config['PASSWORD_HASH_METHOD'],
+                                  salt_length=current_app.config['PASSWORD_SALT_LENGTH'])
+
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with different parameters than the configured ones"""
+    return password_hash.split('$', 1)[0] != canonical_method(current_app.config['PASSWORD_HASH_METHOD'])
+
+
+class HashingPool:
+    """A small worker pool for password hashing with a bounded queue.
+
+    Hashing is deliberately slow, so during a login surge only ``workers``
+    hashes run at once and at most ``max_queue`` more wait. Anything beyond
+    that is rejected straight away instead of tying up request threads
+    that dashboards need.
+    """
+
+    def __init__(self, workers, max_queue, timeout):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._stats = {'completed': 0, 'rejected': 0, 'timed_out': 0,
+                       'peak_pending': 0, 'total_wait_ms': 0.0, 'total_hash_ms': 0.0}
+
+    def _get_executor(self):
+        # Threads are only started on first use
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='password-hash')
+        return self._executor
+
+    def _run(self, queued_at, func, args):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self._stats['total_wait_ms'] += (started - queued_at) * 1000
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._stats['completed'] += 1
+                self._stats['total_hash_ms'] += (time.perf_counter() - started) * 1000
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def submit(self, func, *args):
+        """Run func(*args) on the pool and wait for the result"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HashingBusy('Password hashing queue is full')
+        with self._lock:
+            self._pending += 1
+            self._stats['peak_pending'] = max(self._stats['peak_pending'], self._pending)
+        future = self._get_executor().submit(self._run, time.perf_counter(), func, args)
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            with self._lock:
+                self._stats['timed_out'] += 1
+            raise HashingBusy('Password hashing timed out')
+
+    def verify(self, password_hash, password):
+        return self.submit(check_password_hash, password_hash, password)
+
+    def hash(self, password):
+        return self.submit(generate_password_hash, password,
+                           current_app.config['PASSWORD_HASH_METHOD'],
+                           current_app.config['PASSWORD_SALT_LENGTH'])
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+            completed = stats['completed'] or 1
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'queue_depth': self._pending - self._running,
+                'peak_pending': stats['peak_pending'],
+                'completed': stats['completed'],
+                'rejected': stats['rejected'],
+                'timed_out': stats['timed_out'],
+                'avg_wait_ms': round(stats['total_wait_ms'] / completed, 2),
+                'avg_hash_ms': round(stats['total_hash_ms'] / completed, 2),
+            }
+
+
+def init_hashing(app):
+    app.extensions['password_pool'] = HashingPool(app.config['PASSWORD_HASH_WORKERS'],
+                                                  app.config['PASSWORD_HASH_MAX_QUEUE'],
+                                                  app.config['PASSWORD_HASH_TIMEOUT'])
+
+
+def hashing_pool():
+    return current_app.extensions['password_pool']
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from flask import current_app
+from flask_login import UserMixin
+
+from models import db, User, Doctor
+
+
+class DoctorPrincipal:
+    """The doctor fields views and templates need, detached from the ORM"""
+    __slots__ = ('id', 'first_name', 'surname', 'specialization')
+
+    def __init__(self, id, first_name, surname, specialization):
+        self.id = id
+        self.first_name = first_name
+        self.surname = surname
+        self.specialization = specialization
+
+    @property
+    def name(self):
+        return f"{self.first_name} {self.surname}"
+
+
+class Principal(UserMixin):
+    """Cached stand-in for the logged-in User, used as ``current_user``"""
+
+    def __init__(self, id, username, is_admin, doctor=None):
+        self.id = id
+        self.username = username
+        self.is_admin = bool(is_admin)
+        self.doctor = doctor
+
+    @property
+    def doctor_id(self):
+        return self.doctor.id if self.doctor else None
+
+
+def load_principal(user_id):
+    """Build a principal with one query instead of User + lazy Doctor loads"""
+    row = db.session.query(
+        User.id, User.username, User.is_admin,
+        Doctor.id, Doctor.first_name, Doctor.surname, Doctor.specialization
+    ).outerjoin(Doctor, User.doctor_id == Doctor.id).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    doctor = DoctorPrincipal(*row[3:]) if row[3] is not None else None
+    return Principal(row[0], row[1], row[2], doctor)
+
+
+class PrincipalCache:
+    """Per-process TTL cache of principals keyed by user id"""
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        principal = load_principal(user_id)
+        if principal is not None:
+            with self._lock:
+                if len(self._entries) >= self.max_size:
+                    self._evict_expired(now)
+                if len(self._entries) < self.max_size:
+                    self._entries[user_id] = (now + self.ttl, principal)
+        return principal
+
+    def _evict_expired(self, now):
+        for key in [key for key, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def invalidate_doctor(self, doctor_id):
+        with self._lock:
+            for key in [key for key, (_, principal) in self._entries.items()
+                        if principal.doctor_id == doctor_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def init_principals(app):
+    app.extensions['principal_cache'] = PrincipalCache(app.config['PRINCIPAL_CACHE_TTL'],
+                                                       app.config['PRINCIPAL_CACHE_SIZE'])
+
+
+def principal_cache():
+    return current_app.extensions['principal_cache']
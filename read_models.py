@@ -0,0 +1,115 @@
+from datetime import date
+
+from sqlalchemy import func
+
+from models import db, age_on, Patient, Doctor, Appointment, Prescription, MedicalRecord
+
+# List pages only read a handful of columns, so they select just those
+# (names joined in) and wrap each result row in a small __slots__ object
+# instead of loading ORM entities into the identity map. The attribute
+# names match the models, so the templates work with either.
+
+
+class PersonRow:
+    __slots__ = ('id', 'first_name', 'surname', 'specialization')
+
+    def __init__(self, id, first_name, surname, specialization=None):
+        self.id = id
+        self.first_name = first_name
+        self.surname = surname
+        self.specialization = specialization
+
+    @property
+    def name(self):
+        return f"{self.first_name} {self.surname}"
+
+
+class PatientRow:
+    __slots__ = ('id', 'first_name', 'surname', 'date_of_birth', 'gender', 'date_created', 'appointment_count')
+
+    def __init__(self, row):
+        self.id, self.first_name, self.surname, self.date_of_birth, self.gender, self.date_created = row[:6]
+        # Only present when the select adds a count column
+        self.appointment_count = row[6] if len(row) > 6 else None
+
+    @property
+    def age(self):
+        return age_on(self.date_of_birth, date.today())
+
+
+class AppointmentRow:
+    __slots__ = ('id', 'date', 'start_time', 'end_time', 'diagnosis', 'patient', 'doctor')
+
+    def __init__(self, row):
+        self.id, self.date, self.start_time, self.end_time, self.diagnosis = row[:5]
+        self.patient = PersonRow(*row[5:8])
+        self.doctor = PersonRow(*row[8:12])
+
+
+class PrescriptionRow:
+    __slots__ = ('id', 'medication_name', 'dosage', 'frequency', 'duration', 'instructions', 'date_prescribed',
+                 'patient', 'doctor')
+
+    def __init__(self, row):
+        (self.id, self.medication_name, self.dosage, self.frequency, self.duration, self.instructions,
+         self.date_prescribed) = row[:7]
+        self.patient = PersonRow(*row[7:10])
+        self.doctor = PersonRow(*row[10:13])
+
+
+class MedicalRecordRow:
+    __slots__ = ('id', 'record_type', 'file_name', 'file_size', 'description', 'upload_date', 'patient', 'doctor')
+
+    def __init__(self, row):
+        self.id, self.record_type, self.file_name, self.file_size, self.description, self.upload_date = row[:6]
+        self.patient = PersonRow(*row[6:9])
+        self.doctor = PersonRow(*row[9:13])
+
+    # The same file-type helpers the template calls on the model
+    get_file_extension = MedicalRecord.get_file_extension
+    is_image = MedicalRecord.is_image
+    is_pdf = MedicalRecord.is_pdf
+    can_preview = MedicalRecord.can_preview
+
+
+_PATIENT_NAME = (Patient.id, Patient.first_name, Patient.surname)
+_DOCTOR_NAME = (Doctor.id, Doctor.first_name, Doctor.surname, Doctor.specialization)
+
+
+def appointment_select():
+    return (db.select(Appointment.id, Appointment.date, Appointment.start_time, Appointment.end_time,
+                      Appointment.diagnosis, *_PATIENT_NAME, *_DOCTOR_NAME)
+            .join(Patient, Appointment.patient_id == Patient.id)
+            .join(Doctor, Appointment.doctor_id == Doctor.id))
+
+
+def prescription_select():
+    return (db.select(Prescription.id, Prescription.medication_name, Prescription.dosage, Prescription.frequency,
+                      Prescription.duration, Prescription.instructions, Prescription.date_prescribed,
+                      *_PATIENT_NAME, *_DOCTOR_NAME)
+            .join(Patient, Prescription.patient_id == Patient.id)
+            .join(Doctor, Prescription.doctor_id == Doctor.id))
+
+
+def medical_record_select():
+    return (db.select(MedicalRecord.id, MedicalRecord.record_type, MedicalRecord.file_name, MedicalRecord.file_size,
+                      MedicalRecord.description, MedicalRecord.upload_date, *_PATIENT_NAME, *_DOCTOR_NAME)
+            .join(Patient, MedicalRecord.patient_id == Patient.id)
+            .join(Doctor, MedicalRecord.doctor_id == Doctor.id))
+
+
+def patient_select():
+    return db.select(Patient.id, Patient.first_name, Patient.surname, Patient.date_of_birth, Patient.gender,
+                     Patient.date_created)
+
+
+def fetch(stmt, row_class):
+    """Run one of the selects above and wrap each result row"""
+    return [row_class(row) for row in db.session.execute(stmt)]
+
+
+def fetch_page(stmt, row_class, page, per_page):
+    """One page of rows plus the total row count, as (rows, total)"""
+    total = db.session.scalar(stmt.with_only_columns(func.count(), maintain_column_froms=True).order_by(None))
+    rows = fetch(stmt.limit(per_page).offset((max(page, 1) - 1) * per_page), row_class)
+    return rows, total
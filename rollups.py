@@ -0,0 +1,118 @@
+from collections import Counter
+
+from sqlalchemy import event, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm.attributes import get_history
+
+from models import db, ArchivedPrescription, Prescription, PrescriptionRollup
+
+# PrescriptionRollup is maintained from mapper events, so every flush that
+# inserts, updates or deletes a prescription adjusts the counts in the same
+# transaction: the rollup commits (or rolls back) together with the change.
+# Bulk statements that bypass the ORM must call rebuild() or adjust() themselves.
+# Archiving moves prescriptions without touching the counts, which cover both tables.
+
+
+def month_of(day):
+    return day.replace(day=1)
+
+
+def _rollup_key(medication_name, doctor_id, date_prescribed):
+    # Form values arrive as strings; normalise so an unchanged doctor compares equal
+    return month_of(date_prescribed), medication_name, int(doctor_id)
+
+
+def _current_key(prescription):
+    return _rollup_key(prescription.medication_name, prescription.doctor_id, prescription.date_prescribed)
+
+
+def _committed_key(prescription):
+    """The key as it was in the database before this flush"""
+    values = []
+    for name in ('medication_name', 'doctor_id', 'date_prescribed'):
+        history = get_history(prescription, name)
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        else:
+            values.append(getattr(prescription, name))
+    return _rollup_key(*values)
+
+
+def _upsert(connection, values):
+    """INSERT the count row, or add to it when another transaction created it first"""
+    table = PrescriptionRollup.__table__
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        statement = mysql_insert(table).values(**values)
+        return statement.on_duplicate_key_update(
+            prescription_count=table.c.prescription_count + statement.inserted.prescription_count)
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+        return insert(table).values(**values).on_conflict_do_update(
+            index_elements=[table.c.month, table.c.medication_name, table.c.doctor_id],
+            set_={'prescription_count': table.c.prescription_count + values['prescription_count']})
+    return None  # other databases fall back to UPDATE, then INSERT
+
+
+def adjust(connection, key, delta):
+    """Add ``delta`` to the count of one (month, medication, doctor)"""
+    table = PrescriptionRollup.__table__
+    month, medication_name, doctor_id = key
+    match = (table.c.month == month, table.c.medication_name == medication_name, table.c.doctor_id == doctor_id)
+    if delta > 0:
+        upsert = _upsert(connection, {'month': month, 'medication_name': medication_name,
+                                      'doctor_id': doctor_id, 'prescription_count': delta})
+        if upsert is not None:
+            connection.execute(upsert)
+            return
+    updated = connection.execute(
+        table.update().where(*match).values(prescription_count=table.c.prescription_count + delta))
+    if updated.rowcount == 0:
+        if delta > 0:
+            connection.execute(table.insert().values(month=month, medication_name=medication_name,
+                                                     doctor_id=doctor_id, prescription_count=delta))
+    elif delta < 0:
+        connection.execute(table.delete().where(*match, table.c.prescription_count <= 0))
+
+
+@event.listens_for(Prescription, 'after_insert')
+def _count_inserted(mapper, connection, prescription):
+    adjust(connection, _current_key(prescription), 1)
+
+
+@event.listens_for(Prescription, 'after_update')
+def _count_updated(mapper, connection, prescription):
+    old_key, new_key = _committed_key(prescription), _current_key(prescription)
+    if old_key != new_key:
+        adjust(connection, old_key, -1)
+        adjust(connection, new_key, 1)
+
+
+@event.listens_for(Prescription, 'after_delete')
+def _count_deleted(mapper, connection, prescription):
+    adjust(connection, _committed_key(prescription), -1)
+
+
+def rebuild():
+    """Recount every rollup from the prescription table and its archive; returns the number of rollup rows"""
+    counts = Counter()
+    for model in (Prescription, ArchivedPrescription):
+        rows = db.session.execute(
+            db.select(model.date_prescribed, model.medication_name, model.doctor_id, func.count())
+            .group_by(model.date_prescribed, model.medication_name, model.doctor_id))
+        for date_prescribed, medication_name, doctor_id, count in rows:
+            counts[_rollup_key(medication_name, doctor_id, date_prescribed)] += count
+
+    table = PrescriptionRollup.__table__
+    db.session.execute(table.delete())
+    if counts:
+        db.session.execute(table.insert(), [
+            {'month': month, 'medication_name': medication_name, 'doctor_id': doctor_id, 'prescription_count': count}
+            for (month, medication_name, doctor_id), count in counts.items()
+        ])
+    db.session.commit()
+    return len(counts)
@@ -0,0 +1,44 @@
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+READ_METHODS = ('GET', 'HEAD')
+# Flask session key holding the time until which this client reads from the primary
+PRIMARY_UNTIL_KEY = '_db_primary_until'
+
+
+def read_only(view):
+    """Mark a view as safe to serve from the read pool on GET/HEAD requests"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _reads_go_to_reader():
+    if not has_request_context() or not g.get('db_read_only'):
+        return False
+    if request.method not in READ_METHODS:
+        return False
+    # Read-your-writes: right after this client wrote something, keep it on
+    # the primary so the redirect after a POST shows the new row
+    return session.get(PRIMARY_UNTIL_KEY, 0) < time.time()
+
+
+class RoutingSession(Session):
+    """Session that sends read-only view queries to the read engine, everything else to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _reads_go_to_reader():
+            reader = current_app.extensions.get('db_read_engine')
+            if reader is not None and not (self.new or self.dirty or self.deleted):
+                return reader
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def remember_write(db_session, flush_context):
+    if has_request_context():
+        session[PRIMARY_UNTIL_KEY] = time.time() + current_app.config['READ_YOUR_WRITES_SECONDS']
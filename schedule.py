@@ -0,0 +1,185 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import time as clock_time
+
+from flask import current_app
+
+from fragments import fragment_cache
+from models import db, DoctorSchedule, ScheduleException
+
+# Hours of doctors who have no weekly schedule of their own
+WORKING_DAY_START = clock_time(8, 0)
+WORKING_DAY_END = clock_time(18, 0)
+WORKING_WEEKDAYS = (0, 1, 2, 3, 4)  # Monday to Friday
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+DAY_MINUTES = 24 * 60
+
+# Compiled schedules are rebuilt when either table changes
+SOURCE_TABLES = ('doctor_schedule', 'schedule_exception')
+
+
+def minute_of(value):
+    return value.hour * 60 + value.minute
+
+
+def time_of(minute):
+    return clock_time(*divmod(minute, 60))
+
+
+# A day is a mask: an int with bit n set when minute n after midnight is open
+
+
+def interval_mask(start_minute, end_minute):
+    """Mask with the minutes from start up to (not including) end set"""
+    return ((1 << (end_minute - start_minute)) - 1) << start_minute
+
+
+def mask_minutes(mask):
+    """How many minutes a mask has set (int.bit_count() needs Python 3.10)"""
+    return bin(mask).count('1')
+
+
+def mask_intervals(mask):
+    """(start, end) minute runs of a mask, in order"""
+    minute = 0
+    while mask:
+        zeros = (mask & -mask).bit_length() - 1
+        mask >>= zeros
+        minute += zeros
+        ones = (~mask & (mask + 1)).bit_length() - 1
+        yield minute, minute + ones
+        mask >>= ones
+        minute += ones
+
+
+WHOLE_DAY = interval_mask(0, DAY_MINUTES)
+DEFAULT_WEEK = tuple(interval_mask(minute_of(WORKING_DAY_START), minute_of(WORKING_DAY_END))
+                     if day in WORKING_WEEKDAYS else 0 for day in range(7))
+
+
+def weekday_counts(start, end):
+    """How many of each weekday (Monday first) fall between start and end inclusive"""
+    days = (end - start).days + 1
+    full_weeks, remainder = divmod(days, 7)
+    counts = [full_weeks] * 7
+    for offset in range(remainder):
+        counts[(start.weekday() + offset) % 7] += 1
+    return counts
+
+
+def format_intervals(intervals):
+    return ', '.join(f'{time_of(start).strftime("%H:%M")}-{time_of(end).strftime("%H:%M")}'
+                     for start, end in intervals)
+
+
+def parse_intervals(text):
+    """(start, end) times from text like "08:00-12:00, 13:00-17:00"; raises ValueError"""
+    intervals = []
+    for part in filter(None, (part.strip() for part in text.split(','))):
+        try:
+            start, end = (datetime.strptime(value.strip(), '%H:%M').time() for value in part.split('-'))
+        except ValueError:
+            raise ValueError(f'"{part}" is not a range like 08:00-12:00')
+        if end <= start:
+            raise ValueError(f'"{part}" ends before it starts')
+        intervals.append((start, end))
+    return intervals
+
+
+class CompiledSchedules:
+    """Every doctor's weekly hours and exceptions, as per-weekday and per-date minute masks.
+
+    Built once from the schedule tables, then shared by availability,
+    booking validation, free slot search and utilization.
+    """
+
+    def __init__(self, weeks, closures):
+        self.weeks = weeks  # doctor id -> seven weekday masks
+        self.closures = closures  # doctor id (None for the clinic) -> {date: closed mask}
+
+    def week(self, doctor_id):
+        return self.weeks.get(doctor_id, DEFAULT_WEEK)
+
+    def closed_mask(self, doctor_id, day):
+        return self.closures.get(None, {}).get(day, 0) | self.closures.get(doctor_id, {}).get(day, 0)
+
+    def day_mask(self, doctor_id, day):
+        return self.week(doctor_id)[day.weekday()] & ~self.closed_mask(doctor_id, day)
+
+    def open_intervals(self, doctor_id, day):
+        return list(mask_intervals(self.day_mask(doctor_id, day)))
+
+    def open_minutes(self, doctor_id, day):
+        return mask_minutes(self.day_mask(doctor_id, day))
+
+    def is_open(self, doctor_id, day, start_time, end_time):
+        """Whether the doctor works the whole of start_time to end_time on day"""
+        wanted = interval_mask(minute_of(start_time), minute_of(end_time))
+        return self.day_mask(doctor_id, day) & wanted == wanted
+
+    def capacity_by_weekday(self, doctor_id, start, end):
+        """Open minutes per weekday (Monday first) between start and end inclusive"""
+        week = self.week(doctor_id)
+        capacity = [count * mask_minutes(week[weekday]) for weekday, count in enumerate(weekday_counts(start, end))]
+        closed_days = set(self.closures.get(None, {})) | set(self.closures.get(doctor_id, {}))
+        for day in closed_days:
+            if start <= day <= end:
+                capacity[day.weekday()] -= mask_minutes(week[day.weekday()] & self.closed_mask(doctor_id, day))
+        return capacity
+
+
+def compile_schedules():
+    """CompiledSchedules from the two schedule tables, with one query each"""
+    weeks = {}
+    for doctor_id, weekday, start_time, end_time in db.session.execute(
+            db.select(DoctorSchedule.doctor_id, DoctorSchedule.weekday,
+                      DoctorSchedule.start_time, DoctorSchedule.end_time)):
+        week = weeks.setdefault(doctor_id, [0] * 7)
+        week[weekday] |= interval_mask(minute_of(start_time), minute_of(end_time))
+
+    closures = {}
+    for doctor_id, start_date, end_date, start_time, end_time in db.session.execute(
+            db.select(ScheduleException.doctor_id, ScheduleException.start_date, ScheduleException.end_date,
+                      ScheduleException.start_time, ScheduleException.end_time)):
+        closed = WHOLE_DAY if start_time is None else interval_mask(minute_of(start_time), minute_of(end_time))
+        by_day = closures.setdefault(doctor_id, {})
+        for offset in range((end_date - start_date).days + 1):
+            day = start_date + timedelta(days=offset)
+            by_day[day] = by_day.get(day, 0) | closed
+    return CompiledSchedules({doctor_id: tuple(week) for doctor_id, week in weeks.items()}, closures)
+
+
+class ScheduleCache:
+    """The compiled schedules of this process.
+
+    Recompiled after a commit to either schedule table bumps its fragment
+    cache generation, or after ``ttl`` seconds to pick up changes made by
+    other worker processes.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        generations = fragment_cache().generations(SOURCE_TABLES)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry
+        if entry is not None and entry[0] == generations and entry[1] > now:
+            return entry[2]
+        compiled = compile_schedules()
+        with self._lock:
+            if fragment_cache().generations(SOURCE_TABLES) == generations:
+                self._entry = (generations, now + self.ttl, compiled)
+        return compiled
+
+
+def schedules():
+    return current_app.extensions['schedule_cache'].get()
+
+
+def init_schedules(app):
+    app.extensions['schedule_cache'] = ScheduleCache(app.config['SCHEDULE_CACHE_TTL'])
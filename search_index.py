@@ -0,0 +1,143 @@
+import io
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
+from markupsafe import Markup, escape
+from sqlalchemy import text
+
+import storage
+from models import db, MedicalRecord
+
+INDEXABLE_EXTENSIONS = {'txt', 'pdf', 'docx'}
+MAX_INDEXED_CHARS = 2 * 1024 * 1024  # cap extracted text per record
+MAX_SEARCH_RESULTS = 500
+
+# Snippet markers are control characters so the snippet can be HTML-escaped
+# before the highlight tags are put in
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+_WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+# One background worker is plenty: uploads are rare and extraction is I/O bound
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='record-indexer')
+
+
+def is_enabled():
+    """Full-text search relies on SQLite's FTS5 extension (table created by migration 4e8a1c2d9f07)"""
+    return db.engine.dialect.name == 'sqlite'
+
+
+def is_indexable(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in INDEXABLE_EXTENSIONS
+
+
+def _extract_txt(stream):
+    return stream.read(MAX_INDEXED_CHARS).decode('utf-8', errors='replace')
+
+
+def _extract_pdf(stream):
+    # Imported lazily: pypdf is optional and slow to import
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return ''
+    reader = PdfReader(stream)
+    parts = []
+    for page in reader.pages:
+        parts.append(page.extract_text() or '')
+    return '\n'.join(parts)
+
+
+def _extract_docx(stream):
+    # A DOCX file is a zip archive; the body text lives in word/document.xml
+    with zipfile.ZipFile(stream) as archive:
+        document = ElementTree.fromstring(archive.read('word/document.xml'))
+    paragraphs = []
+    for paragraph in document.iter(_WORD_NAMESPACE + 'p'):
+        paragraphs.append(''.join(node.text or '' for node in paragraph.iter(_WORD_NAMESPACE + 't')))
+    return '\n'.join(paragraphs)
+
+
+_EXTRACTORS = {
+    'txt': _extract_txt,
+    'pdf': _extract_pdf,
+    'docx': _extract_docx,
+}
+
+
+def extract_text(medical_record):
+    """Pull the plain text out of a stored record file"""
+    extractor = _EXTRACTORS.get(medical_record.get_file_extension().lstrip('.'))
+    if extractor is None:
+        return ''
+    with storage.open_record(medical_record.file_path) as stream:
+        if extractor is not _extract_txt:
+            # zipfile and pypdf need a seekable file
+            stream = _seekable(stream)
+        return extractor(stream)[:MAX_INDEXED_CHARS]
+
+
+def _seekable(stream):
+    if stream.seekable():
+        return stream
+    return io.BytesIO(stream.read())
+
+
+def index_record(record_id):
+    """Extract a record's text and (re)write its index entry"""
+    medical_record = db.session.get(MedicalRecord, record_id)
+    if medical_record is None:
+        return
+    content = extract_text(medical_record)
+    db.session.execute(text("DELETE FROM medical_record_fts WHERE rowid = :id"), {'id': record_id})
+    if content.strip():
+        db.session.execute(text("INSERT INTO medical_record_fts (rowid, content) VALUES (:id, :content)"),
+                           {'id': record_id, 'content': content})
+    db.session.commit()
+
+
+def _index_in_background(app, record_id):
+    with app.app_context():
+        try:
+            index_record(record_id)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning('Could not index medical record %s: %s', record_id, e)
+
+
+def schedule_indexing(app, medical_record):
+    """Queue a freshly uploaded record for text extraction"""
+    if is_enabled() and is_indexable(medical_record.file_name):
+        _executor.submit(_index_in_background, app, medical_record.id)
+
+
+def remove_record(record_id):
+    if is_enabled():
+        db.session.execute(text("DELETE FROM medical_record_fts WHERE rowid = :id"), {'id': record_id})
+
+
+def _match_expression(search_query):
+    # Quote every word so user input can never be parsed as FTS5 syntax,
+    # and prefix-match so "hba1" finds "HbA1c"
+    words = re.findall(r'\w+', search_query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search(search_query, limit=MAX_SEARCH_RESULTS):
+    """Return {record_id: highlighted snippet} for records whose contents match"""
+    expression = _match_expression(search_query)
+    if not expression or not is_enabled():
+        return {}
+    rows = db.session.execute(text(
+        "SELECT rowid, snippet(medical_record_fts, 0, :start, :end, '…', 12) "
+        "FROM medical_record_fts WHERE medical_record_fts MATCH :expression "
+        "ORDER BY rank LIMIT :limit"
+    ), {'start': _MARK_START, 'end': _MARK_END, 'expression': expression, 'limit': limit})
+    return {record_id: _highlight(snippet) for record_id, snippet in rows}
+
+
+def _highlight(snippet):
+    escaped = str(escape(snippet))
+    return Markup(escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
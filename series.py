@@ -0,0 +1,160 @@
+import calendar
+from datetime import date, timedelta
+
+from sqlalchemy import or_, update
+
+import audit
+import changes
+from models import db, Appointment, AppointmentSeries, Doctor
+from schedule import schedules
+
+FREQUENCIES = ('weekly', 'monthly')
+MAX_OCCURRENCES = 52
+MAX_INTERVAL = 12
+BOOKING_HORIZON_DAYS = 365  # appointments may be booked up to a year ahead
+
+
+def _add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(index, 12)
+    month += 1
+    # The 31st of a shorter month falls back to its last day
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence_dates(first_date, frequency, interval, occurrences):
+    """Dates of a series, first_date included; raises ValueError for an invalid rule"""
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Repeat must be one of: {', '.join(FREQUENCIES)}")
+    if not 1 <= interval <= MAX_INTERVAL:
+        raise ValueError(f'The repeat interval must be between 1 and {MAX_INTERVAL}')
+    if not 2 <= occurrences <= MAX_OCCURRENCES:
+        raise ValueError(f'A series must have between 2 and {MAX_OCCURRENCES} appointments')
+    if frequency == 'weekly':
+        return [first_date + timedelta(weeks=interval * n) for n in range(occurrences)]
+    return [_add_months(first_date, interval * n) for n in range(occurrences)]
+
+
+def closed_dates_message(dates, doctor_id, start_time, end_time):
+    """Which dates the doctor doesn't work the whole slot, as a message, or None"""
+    compiled = schedules()
+    closed = [day for day in dates if not compiled.is_open(doctor_id, day, start_time, end_time)]
+    if closed:
+        return "Outside the doctor's working hours on: " + ', '.join(day.strftime('%a %d %b %Y') for day in closed)
+    return None
+
+
+def check_dates(dates, doctor_id, start_time, end_time):
+    """The problems with booking the slot on these dates, as messages (empty when they are all bookable)"""
+    problems = []
+    closed = closed_dates_message(dates, doctor_id, start_time, end_time)
+    if closed:
+        problems.append(closed)
+    if max(dates) > date.today() + timedelta(days=BOOKING_HORIZON_DAYS):
+        problems.append('Cannot book appointments more than one year in advance!')
+    return problems
+
+
+def find_conflicts(dates, start_time, end_time, doctor_id, patient_id, replacing=None):
+    """Appointments overlapping the slot on any of the dates, for the doctor or the patient.
+
+    One query covers every date. ``replacing`` is a (series id, from date)
+    pair whose occurrences are being rewritten, so they don't conflict with
+    themselves.
+    """
+    query = (db.session.query(Appointment.date, Appointment.start_time, Appointment.end_time,
+                              Appointment.doctor_id, Appointment.patient_id, Doctor.first_name, Doctor.surname)
+             .join(Doctor, Appointment.doctor_id == Doctor.id)
+             .filter(Appointment.date.in_(dates),
+                     or_(Appointment.doctor_id == doctor_id, Appointment.patient_id == patient_id),
+                     Appointment.start_time < end_time,
+                     Appointment.end_time > start_time))
+    if replacing is not None:
+        series_id, from_date = replacing
+        query = query.filter(or_(Appointment.series_id.is_(None), Appointment.series_id != series_id,
+                                 Appointment.date < from_date))
+    return query.order_by(Appointment.date, Appointment.start_time).all()
+
+
+def describe_conflicts(conflicts, doctor_id):
+    lines = []
+    for conflict in conflicts:
+        if conflict.doctor_id == doctor_id:
+            who = 'the doctor'
+        else:
+            who = f'the patient (with Dr. {conflict.first_name} {conflict.surname})'
+        lines.append(f"{conflict.date.strftime('%a %d %b %Y')} {conflict.start_time.strftime('%H:%M')}-"
+                     f"{conflict.end_time.strftime('%H:%M')} for {who}")
+    return lines
+
+
+def book_series(patient_id, doctor_id, first_date, start_time, end_time, diagnosis, frequency, interval, occurrences):
+    """Validate and insert a whole series in one transaction.
+
+    Returns (series, problems): the new series, or None with the messages
+    explaining why nothing was booked.
+    """
+    dates = occurrence_dates(first_date, frequency, interval, occurrences)
+    problems = check_dates(dates, doctor_id, start_time, end_time)
+    if problems:
+        return None, problems
+    conflicts = find_conflicts(dates, start_time, end_time, doctor_id, patient_id)
+    if conflicts:
+        return None, describe_conflicts(conflicts, doctor_id)
+
+    series = AppointmentSeries(frequency=frequency, interval=interval, start_date=first_date,
+                               patient_id=patient_id, doctor_id=doctor_id)
+    series.appointments = [
+        Appointment(date=day, start_time=start_time, end_time=end_time, diagnosis=diagnosis,
+                    patient_id=patient_id, doctor_id=doctor_id)
+        for day in dates
+    ]
+    db.session.add(series)
+    db.session.commit()
+    return series, []
+
+
+def update_following(appointment, start_time, end_time, diagnosis, doctor_id):
+    """Apply new times, notes and doctor to an occurrence and every later one of its series.
+
+    Earlier occurrences keep the old details, so the later ones are split off
+    into a series of their own. The occurrences are rewritten with a single
+    UPDATE. Returns (number updated, problems).
+    """
+    series = appointment.series
+    from_date = appointment.date
+    following = Appointment.query.filter(Appointment.series_id == series.id, Appointment.date >= from_date)
+    previous = following.with_entities(Appointment.id, Appointment.date, Appointment.start_time, Appointment.end_time,
+                                       Appointment.diagnosis, Appointment.doctor_id, Appointment.series_id).all()
+    dates = [row.date for row in previous]
+    closed = closed_dates_message(dates, doctor_id, start_time, end_time)
+    if closed:
+        return 0, [closed]
+    conflicts = find_conflicts(dates, start_time, end_time, doctor_id, series.patient_id,
+                               replacing=(series.id, from_date))
+    if conflicts:
+        return 0, describe_conflicts(conflicts, doctor_id)
+
+    target = series
+    if len(dates) < Appointment.query.filter_by(series_id=series.id).count():
+        target = AppointmentSeries(frequency=series.frequency, interval=series.interval, start_date=from_date,
+                                   patient_id=series.patient_id)
+        db.session.add(target)
+    target.doctor_id = doctor_id
+    db.session.flush()
+
+    values = dict(start_time=start_time, end_time=end_time, diagnosis=diagnosis, doctor_id=doctor_id,
+                  series_id=target.id)
+    result = db.session.execute(
+        update(Appointment)
+        .where(Appointment.series_id == series.id, Appointment.date >= from_date)
+        .values(**values)
+        .execution_options(synchronize_session='fetch'))
+    # The UPDATE bypassed the unit of work, so tell the audit log, change feed and caches ourselves
+    for row in previous:
+        diff = {key: [getattr(row, key), value] for key, value in values.items() if getattr(row, key) != value}
+        if diff:
+            audit.record(db.session, 'update', 'appointment', row.id, diff)
+    changes.record(db.session, 'appointment', [row.id for row in previous])
+    db.session.commit()
+    return result.rowcount, []
@@ -0,0 +1,91 @@
+import heapq
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from models import db, Doctor, Appointment
+from schedule import minute_of, schedules
+from series import BOOKING_HORIZON_DAYS
+
+SLOT_STEP_MINUTES = 30  # appointments start on the half hour, as in the booking form
+FIRST_WINDOW_DAYS = 1  # the search starts with one day and doubles while too few slots turn up
+MAX_DURATION_MINUTES = 12 * 60  # longer requests would scan the whole horizon for nothing
+
+
+def free_gaps(bookings, opens, closes):
+    """(start, end) minute ranges between the sorted (start, end) bookings from opens to closes"""
+    cursor = opens
+    for start, end in bookings:
+        if start > cursor:
+            yield cursor, min(start, closes)
+        cursor = max(cursor, end)
+        if cursor >= closes:
+            return
+    if cursor < closes:
+        yield cursor, closes
+
+
+def doctor_slots(doctor, days, bookings, duration, not_before, compiled):
+    """The earliest slot of ``duration`` minutes in each free gap of one doctor, in time order.
+
+    ``bookings`` maps each day to the doctor's sorted (start, end) minutes;
+    gaps are only looked for within the doctor's open hours in ``compiled``.
+    Yields (start datetime, doctor, end datetime).
+    """
+    for day in days:
+        earliest = minute_of(not_before) if day == not_before.date() else 0
+        midnight = datetime.combine(day, datetime.min.time())
+        for opens, closes in compiled.open_intervals(doctor.id, day):
+            for gap_start, gap_end in free_gaps(bookings.get(day, ()), opens, closes):
+                start = max(gap_start, earliest)
+                start += -start % SLOT_STEP_MINUTES  # round up onto the booking grid
+                if start + duration <= gap_end:
+                    yield midnight + timedelta(minutes=start), doctor, midnight + timedelta(minutes=start + duration)
+
+
+def _bookings_by_doctor(doctor_ids, first_day, last_day):
+    bookings = defaultdict(lambda: defaultdict(list))
+    rows = db.session.execute(
+        db.select(Appointment.doctor_id, Appointment.date, Appointment.start_time, Appointment.end_time)
+        .where(Appointment.date >= first_day, Appointment.date <= last_day,
+               Appointment.doctor_id.in_(doctor_ids))
+        .order_by(Appointment.doctor_id, Appointment.date, Appointment.start_time))
+    for doctor_id, day, start_time, end_time in rows:
+        bookings[doctor_id][day].append((minute_of(start_time), minute_of(end_time)))
+    return bookings
+
+
+def next_free_slots(duration, earliest, limit, specialization=None, now=None):
+    """The next ``limit`` free slots across every matching doctor, earliest first.
+
+    Each window of days is loaded with one query, and the doctors' slot
+    generators are merged by start time so the search stops as soon as
+    ``limit`` slots are found. Windows double in length until then or until
+    the booking horizon is reached. Returns (slots, last day searched).
+    """
+    now = now or datetime.now()
+    not_before = max(datetime.combine(earliest, datetime.min.time()), now)
+    horizon = now.date() + timedelta(days=BOOKING_HORIZON_DAYS)
+
+    query = db.select(Doctor.id, Doctor.first_name, Doctor.surname, Doctor.specialization)
+    if specialization:
+        query = query.where(Doctor.specialization == specialization)
+    doctors = db.session.execute(query.order_by(Doctor.id)).all()
+    compiled = schedules()
+
+    slots = []
+    first_day = not_before.date()
+    window = FIRST_WINDOW_DAYS
+    last_day = first_day - timedelta(days=1)
+    while doctors and len(slots) < limit and first_day <= horizon:
+        last_day = min(first_day + timedelta(days=window - 1), horizon)
+        days = [first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+        bookings = _bookings_by_doctor([doctor.id for doctor in doctors], first_day, last_day)
+        merged = heapq.merge(*(doctor_slots(doctor, days, bookings[doctor.id], duration, not_before, compiled)
+                               for doctor in doctors), key=lambda slot: (slot[0], slot[1].id))
+        for slot in merged:
+            slots.append(slot)
+            if len(slots) == limit:
+                break
+        first_day = last_day + timedelta(days=1)
+        window *= 2
+    return slots, last_day
@@ -0,0 +1,242 @@
+// COMPLETE MODAL FIX
+document.addEventListener('DOMContentLoaded', function() {
+    // Fix for all modal close buttons
+    document.querySelectorAll('[data-bs-dismiss="modal"], .btn-close, .btn-outline-secondary').forEach(button => {
+        button.addEventListener('click', function() {
+            // Force hide all modals
+            var modals = document.querySelectorAll('.modal');
+            modals.forEach(modal => {
+                var modalInstance = bootstrap.Modal.getInstance(modal);
+                if (modalInstance) {
+                    modalInstance.hide();
+                }
+                modal.style.display = 'none';
+            });
+
+            // Force remove backdrops
+            document.querySelectorAll('.modal-backdrop').forEach(backdrop => {
+                backdrop.remove();
+            });
+
+            // Force reset body
+            document.body.classList.remove('modal-open');
+            document.body.style.overflow = 'auto';
+            document.body.style.paddingRight = '0';
+        });
+    });
+
+    // Prevent multiple modals from opening
+    document.querySelectorAll('.modal').forEach(modal => {
+        modal.addEventListener('show.bs.modal', function() {
+            // Hide all other modals first
+            document.querySelectorAll('.modal').forEach(otherModal => {
+                if (otherModal !== modal) {
+                    var otherInstance = bootstrap.Modal.getInstance(otherModal);
+                    if (otherInstance) {
+                        otherInstance.hide();
+                    }
+                }
+            });
+        });
+    });
+
+    // Auto-dismiss alerts after 5 seconds
+    const alerts = document.querySelectorAll('.alert');
+    alerts.forEach(alert => {
+        setTimeout(() => {
+            if (alert) {
+                const bsAlert = new bootstrap.Alert(alert);
+                bsAlert.close();
+            }
+        }, 5000);
+    });
+
+    // Add active class to current page in navigation
+    const currentLocation = location.href;
+    const navLinks = document.querySelectorAll('.navbar-nav .nav-link');
+    navLinks.forEach(link => {
+        if (link.href === currentLocation) {
+            link.classList.add('active');
+            link.style.backgroundColor = 'rgba(255, 203, 116, 0.2)';
+        }
+    });
+});
+
+// Selects rendered from the cached option lists carry their value in data-selected
+function applySelectedValues(root) {
+    root.querySelectorAll('select[data-selected]').forEach(select => {
+        select.value = select.dataset.selected;
+    });
+}
+
+// Load a dialog fragment into the shared modal
+function loadFragment(url) {
+    const modal = document.getElementById('fragmentModal');
+    const dialog = modal.querySelector('.modal-dialog');
+    return fetch(url, {credentials: 'same-origin'})
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('HTTP ' + response.status);
+            }
+            return response.text();
+        })
+        .then(html => {
+            dialog.innerHTML = html;
+            const content = dialog.querySelector('.modal-content');
+            dialog.className = 'modal-dialog ' + ((content && content.dataset.dialogClass) || '');
+            applySelectedValues(dialog);
+            dialog.querySelectorAll('[data-bs-toggle="tooltip"]').forEach(el => new bootstrap.Tooltip(el));
+        })
+        .catch(() => {
+            dialog.className = 'modal-dialog';
+            dialog.innerHTML = '<div class="modal-content"><div class="modal-body text-center py-5 text-danger">' +
+                '<i class="fas fa-exclamation-triangle me-2"></i>Could not load details. Please try again.</div></div>';
+        });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    applySelectedValues(document);
+
+    const modal = document.getElementById('fragmentModal');
+    modal.addEventListener('show.bs.modal', function(event) {
+        const trigger = event.relatedTarget;
+        if (trigger && trigger.dataset.fragmentUrl) {
+            loadFragment(trigger.dataset.fragmentUrl);
+        }
+    });
+    modal.addEventListener('hidden.bs.modal', function() {
+        const dialog = modal.querySelector('.modal-dialog');
+        dialog.className = 'modal-dialog';
+        dialog.innerHTML = '<div class="modal-content"><div class="modal-body text-center py-5 text-muted">' +
+            '<i class="fas fa-spinner fa-spin me-2"></i>Loading...</div></div>';
+    });
+    // Buttons inside a dialog (e.g. "Edit" on a detail view) swap in another fragment
+    modal.addEventListener('click', function(event) {
+        const swap = event.target.closest('[data-fragment-swap]');
+        if (swap) {
+            event.preventDefault();
+            loadFragment(swap.dataset.fragmentSwap);
+        }
+    });
+});
+
+// Patient typeahead (templates/fragments/patient_picker.html). Handlers are
+// delegated so pickers inside dynamically loaded dialogs work too.
+function choosePatient(widget, id, label) {
+    const input = widget.querySelector('.patient-typeahead-input');
+    const hidden = widget.querySelector('input[type="hidden"]');
+    input.value = label;
+    input.setCustomValidity('');
+    hidden.value = id;
+    hidden.dispatchEvent(new Event('change', {bubbles: true}));
+    widget.querySelector('.patient-typeahead-results').style.display = 'none';
+}
+
+function showPatientResults(widget, results) {
+    const list = widget.querySelector('.patient-typeahead-results');
+    list.innerHTML = '';
+    if (!results.length) {
+        const empty = document.createElement('div');
+        empty.className = 'list-group-item text-muted small';
+        empty.textContent = 'No matching patients';
+        list.appendChild(empty);
+    }
+    results.forEach(patient => {
+        const item = document.createElement('button');
+        item.type = 'button';
+        item.className = 'list-group-item list-group-item-action py-2';
+        item.dataset.patientId = patient.id;
+        item.dataset.patientLabel = patient.name;
+        const name = document.createElement('div');
+        name.className = 'fw-medium';
+        name.textContent = patient.name;
+        const details = document.createElement('div');
+        details.className = 'small text-muted';
+        details.textContent = '#' + patient.id + ' · ' + patient.age + ' yrs · ' + (patient.gender || '') +
+            (patient.phone ? ' · ' + patient.phone : '');
+        item.append(name, details);
+        list.appendChild(item);
+    });
+    list.style.display = 'block';
+}
+
+document.addEventListener('input', function(event) {
+    const input = event.target.closest('.patient-typeahead-input');
+    if (!input) {
+        return;
+    }
+    const widget = input.closest('.patient-typeahead');
+    const hidden = widget.querySelector('input[type="hidden"]');
+    if (hidden.value) {
+        hidden.value = '';
+        hidden.dispatchEvent(new Event('change', {bubbles: true}));
+    }
+    input.setCustomValidity(input.required && input.value ? 'Choose a patient from the list' : '');
+    clearTimeout(widget.searchTimer);
+    const query = input.value.trim();
+    if (!query) {
+        widget.querySelector('.patient-typeahead-results').style.display = 'none';
+        return;
+    }
+    widget.searchTimer = setTimeout(() => {
+        const sequence = (widget.searchSequence || 0) + 1;
+        widget.searchSequence = sequence;
+        fetch(widget.dataset.searchUrl + '?q=' + encodeURIComponent(query), {credentials: 'same-origin'})
+            .then(response => response.json())
+            .then(data => {
+                // Ignore answers to searches the user has already typed past
+                if (widget.searchSequence === sequence) {
+                    showPatientResults(widget, data.results || []);
+                }
+            });
+    }, 200);
+});
+
+document.addEventListener('keydown', function(event) {
+    const input = event.target.closest('.patient-typeahead-input');
+    if (!input) {
+        return;
+    }
+    const list = input.closest('.patient-typeahead').querySelector('.patient-typeahead-results');
+    const items = Array.from(list.querySelectorAll('[data-patient-id]'));
+    if (list.style.display === 'none' || !items.length) {
+        return;
+    }
+    let index = items.findIndex(item => item.classList.contains('active'));
+    if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+        event.preventDefault();
+        index = event.key === 'ArrowDown' ? Math.min(index + 1, items.length - 1) : Math.max(index - 1, 0);
+        items.forEach((item, position) => item.classList.toggle('active', position === index));
+        items[index].scrollIntoView({block: 'nearest'});
+    } else if (event.key === 'Enter') {
+        event.preventDefault();
+        const item = items[Math.max(index, 0)];
+        choosePatient(input.closest('.patient-typeahead'), item.dataset.patientId, item.dataset.patientLabel);
+    } else if (event.key === 'Escape') {
+        list.style.display = 'none';
+    }
+});
+
+document.addEventListener('click', function(event) {
+    const item = event.target.closest('.patient-typeahead-results [data-patient-id]');
+    if (item) {
+        choosePatient(item.closest('.patient-typeahead'), item.dataset.patientId, item.dataset.patientLabel);
+        return;
+    }
+    document.querySelectorAll('.patient-typeahead-results').forEach(list => {
+        if (!list.closest('.patient-typeahead').contains(event.target)) {
+            list.style.display = 'none';
+        }
+    });
+});
+
+// Emergency fix - run this in browser console if stuck
+function forceCloseModals() {
+    document.querySelectorAll('.modal').forEach(modal => {
+        modal.style.display = 'none';
+        modal.classList.remove('show');
+    });
+    document.querySelectorAll('.modal-backdrop').forEach(backdrop => backdrop.remove());
+    document.body.classList.remove('modal-open');
+    document.body.style.overflow = 'auto';
+}
@@ -0,0 +1,347 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const appointmentForm = document.getElementById('appointmentForm');
+    const toggleButton = document.getElementById('toggleAppointmentForm');
+    const cancelButton = document.getElementById('cancelAppointment');
+    const dateInput = document.getElementById('appointmentDate');
+    const startTimeSelect = document.getElementById('startTime');
+    const endTimeSelect = document.getElementById('endTime');
+    const doctorSelect = document.getElementById('doctorSelect');
+    const patientSelect = document.getElementById('patientSelect');
+    const dateError = document.getElementById('dateError');
+    const timeError = document.getElementById('timeError');
+    const availabilityInfo = document.getElementById('availabilityInfo');
+    const submitButton = document.getElementById('submitAppointment');
+
+    // Convert Python booked_slots to JavaScript object
+    var bookedSlots = {};
+    var bookedSlotsElement = document.getElementById('bookedSlotsData');
+    if (bookedSlotsElement) {
+        try {
+            bookedSlots = JSON.parse(bookedSlotsElement.textContent);
+        } catch (e) {
+            console.error('Error parsing booked slots:', e);
+        }
+    }
+
+    // Convert Python patient_booked_slots to JavaScript object
+    var patientBookedSlots = {};
+    var patientBookedSlotsElement = document.getElementById('patientBookedSlotsData');
+    if (patientBookedSlotsElement) {
+        try {
+            patientBookedSlots = JSON.parse(patientBookedSlotsElement.textContent);
+        } catch (e) {
+            console.error('Error parsing patient booked slots:', e);
+        }
+    }
+
+    // Set maximum date to one year from today
+    var today = new Date();
+    var maxDate = new Date();
+    maxDate.setFullYear(today.getFullYear() + 1);
+
+    // Format dates for input min/max attributes
+    var yyyy = today.getFullYear();
+    var mm = today.getMonth() + 1;
+    var dd = today.getDate();
+
+    if (mm < 10) mm = '0' + mm;
+    if (dd < 10) dd = '0' + dd;
+
+    var minDate = yyyy + '-' + mm + '-' + dd;
+    dateInput.min = minDate;
+
+    var maxYYYY = maxDate.getFullYear();
+    var maxMM = maxDate.getMonth() + 1;
+    var maxDD = maxDate.getDate();
+
+    if (maxMM < 10) maxMM = '0' + maxMM;
+    if (maxDD < 10) maxDD = '0' + maxDD;
+
+    var maxDateStr = maxYYYY + '-' + maxMM + '-' + maxDD;
+    dateInput.max = maxDateStr;
+
+    // Generate time slots from 8:00 AM to 6:00 PM in 30-minute intervals
+    function generateTimeSlots() {
+        var slots = [];
+        for (var hour = 8; hour <= 17; hour++) {
+            for (var minute = 0; minute < 60; minute += 30) {
+                // Skip times after 5:30 PM (17:30)
+                if (hour == 17 && minute > 0) break;
+
+                var hourStr = hour < 10 ? '0' + hour : hour.toString();
+                var minuteStr = minute < 10 ? '0' + minute : minute.toString();
+                var timeString = hourStr + ':' + minuteStr;
+                slots.push(timeString);
+            }
+        }
+        return slots;
+    }
+
+    // Check if a time slot is available for doctor
+    function isDoctorTimeSlotAvailable(doctorId, dateString, startTime, endTime) {
+        var key = doctorId + '_' + dateString;
+        var bookedForThisSlot = bookedSlots[key] || [];
+
+        // Convert start and end times to minutes for easier comparison
+        function timeToMinutes(timeStr) {
+            var parts = timeStr.split(':');
+            return parseInt(parts[0]) * 60 + parseInt(parts[1]);
+        }
+
+        var startMinutes = timeToMinutes(startTime);
+        var endMinutes = timeToMinutes(endTime);
+
+        // Check for conflicts with existing appointments
+        for (var i = 0; i < bookedForThisSlot.length; i++) {
+            var bookedStart = timeToMinutes(bookedForThisSlot[i].start);
+            var bookedEnd = timeToMinutes(bookedForThisSlot[i].end);
+
+            // Check for overlap
+            if ((startMinutes < bookedEnd) && (endMinutes > bookedStart)) {
+                return false; // Conflict found
+            }
+        }
+
+        return true; // No conflicts
+    }
+
+    // Check if patient has any appointments at this time
+    function isPatientTimeSlotAvailable(patientId, dateString, startTime, endTime) {
+        var key = patientId + '_' + dateString;
+        var bookedForThisSlot = patientBookedSlots[key] || [];
+
+        // If patient has no appointments on this date, all slots are available
+        if (bookedForThisSlot.length === 0) {
+            return true;
+        }
+
+        // Convert start and end times to minutes for easier comparison
+        function timeToMinutes(timeStr) {
+            var parts = timeStr.split(':');
+            return parseInt(parts[0]) * 60 + parseInt(parts[1]);
+        }
+
+        var startMinutes = timeToMinutes(startTime);
+        var endMinutes = timeToMinutes(endTime);
+
+        // Check for conflicts with existing appointments
+        for (var i = 0; i < bookedForThisSlot.length; i++) {
+            var bookedStart = timeToMinutes(bookedForThisSlot[i].start);
+            var bookedEnd = timeToMinutes(bookedForThisSlot[i].end);
+
+            // Check for overlap
+            if ((startMinutes < bookedEnd) && (endMinutes > bookedStart)) {
+                return false; // Conflict found
+            }
+        }
+
+        return true; // No conflicts
+    }
+
+    // Get patient's booked times for the selected date
+    function getPatientBookedTimes(patientId, dateString) {
+        var key = patientId + '_' + dateString;
+        return patientBookedSlots[key] || [];
+    }
+
+    // Update time slots based on selected doctor, patient and date
+    function updateTimeSlots() {
+        var doctorId = doctorSelect.value;
+        var patientId = patientSelect.value;
+        var dateValue = dateInput.value;
+
+        startTimeSelect.innerHTML = '<option value="" disabled selected>Start Time</option>';
+        endTimeSelect.innerHTML = '<option value="" disabled selected>End Time</option>';
+        timeError.style.display = 'none';
+
+        if (!doctorId || !patientId || !dateValue) {
+            availabilityInfo.textContent = 'Select a doctor, patient and date to see available times';
+            availabilityInfo.className = 'form-text';
+            return;
+        }
+
+        var allSlots = generateTimeSlots();
+        var availableSlots = [];
+
+        // Get patient's existing appointments for this date
+        var patientBookedTimes = getPatientBookedTimes(patientId, dateValue);
+
+        // Find available start times (check both doctor and patient availability)
+        for (var i = 0; i < allSlots.length - 1; i++) {
+            var startTime = allSlots[i];
+            var endTime = allSlots[i + 1];
+
+            var doctorAvailable = isDoctorTimeSlotAvailable(doctorId, dateValue, startTime, endTime);
+            var patientAvailable = isPatientTimeSlotAvailable(patientId, dateValue, startTime, endTime);
+
+            if (doctorAvailable && patientAvailable) {
+                availableSlots.push(startTime);
+                var option = document.createElement('option');
+                option.value = startTime;
+                option.textContent = startTime;
+                startTimeSelect.appendChild(option);
+            }
+        }
+
+        if (availableSlots.length == 0) {
+            if (patientBookedTimes.length > 0) {
+                availabilityInfo.textContent = 'Patient has appointments throughout the day. No available time slots.';
+                availabilityInfo.className = 'form-text text-warning';
+            } else {
+                availabilityInfo.textContent = 'No available time slots for this doctor on the selected date';
+                availabilityInfo.className = 'form-text text-danger';
+            }
+        } else {
+            if (patientBookedTimes.length > 0) {
+                availabilityInfo.textContent = availableSlots.length + ' available time slot(s) - showing only times patient is free';
+                availabilityInfo.className = 'form-text text-success';
+            } else {
+                availabilityInfo.textContent = availableSlots.length + ' available time slot(s)';
+                availabilityInfo.className = 'form-text text-success';
+            }
+        }
+    }
+
+    // Update end time options based on selected start time
+    function updateEndTimeOptions() {
+        var startTime = startTimeSelect.value;
+        if (!startTime) return;
+
+        endTimeSelect.innerHTML = '<option value="" disabled selected>End Time</option>';
+
+        var allSlots = generateTimeSlots();
+        var startIndex = allSlots.indexOf(startTime);
+
+        if (startIndex === -1) return;
+
+        // Add end time options (minimum 30 minutes, maximum until end of day)
+        for (var i = startIndex + 1; i < allSlots.length; i++) {
+            var endTime = allSlots[i];
+            var option = document.createElement('option');
+            option.value = endTime;
+            option.textContent = endTime;
+            endTimeSelect.appendChild(option);
+        }
+    }
+
+    // Function to check if date is a weekday (Monday-Friday)
+    function isWeekday(dateString) {
+        var date = new Date(dateString);
+        var day = date.getDay();
+        return day != 0 && day != 6;
+    }
+
+    // Validate date input
+    dateInput.addEventListener('change', function() {
+        var selectedDate = new Date(this.value);
+
+        // Check if it's a weekday
+        if (!isWeekday(this.value)) {
+            dateError.style.display = 'block';
+            if (submitButton) submitButton.disabled = true;
+            return;
+        } else {
+            dateError.style.display = 'none';
+        }
+
+        // Check if date is more than a year ahead
+        if (selectedDate > maxDate) {
+            alert('Cannot book appointments more than one year in advance.');
+            this.value = '';
+            if (submitButton) submitButton.disabled = true;
+        } else {
+            if (submitButton) submitButton.disabled = false;
+        }
+
+        updateTimeSlots();
+    });
+
+    // Toggle form visibility
+    toggleButton.addEventListener('click', function() {
+        if (appointmentForm.style.display === 'none') {
+            appointmentForm.style.display = 'block';
+            toggleButton.innerHTML = '<i class="fas fa-eye me-1"></i>View Appointments';
+            toggleButton.classList.remove('btn-primary');
+            toggleButton.classList.add('btn-secondary');
+        } else {
+            appointmentForm.style.display = 'none';
+            toggleButton.innerHTML = '<i class="fas fa-plus me-1"></i>Add New Appointment';
+            toggleButton.classList.remove('btn-secondary');
+            toggleButton.classList.add('btn-primary');
+        }
+    });
+
+    // Cancel button handler
+    cancelButton.addEventListener('click', function() {
+        appointmentForm.style.display = 'none';
+        toggleButton.innerHTML = '<i class="fas fa-plus me-1"></i>Add New Appointment';
+        toggleButton.classList.remove('btn-secondary');
+        toggleButton.classList.add('btn-primary');
+    });
+
+    // Event listeners for doctor, patient and date changes
+    doctorSelect.addEventListener('change', updateTimeSlots);
+    patientSelect.addEventListener('change', updateTimeSlots);
+    dateInput.addEventListener('change', updateTimeSlots);
+    startTimeSelect.addEventListener('change', updateEndTimeOptions);
+
+    // Form submission validation
+    var appointmentFormElem = document.getElementById('appointmentBookingForm');
+    if (appointmentFormElem) {
+        appointmentFormElem.addEventListener('submit', function(e) {
+            // Validate weekday
+            if (!isWeekday(dateInput.value)) {
+                e.preventDefault();
+                dateError.style.display = 'block';
+                alert('Please select a weekday (Monday-Friday) for your appointment.');
+                return false;
+            }
+
+            // Validate date is not more than a year ahead
+            var selectedDate = new Date(dateInput.value);
+            if (selectedDate > maxDate) {
+                e.preventDefault();
+                alert('Cannot book appointments more than one year in advance.');
+                return false;
+            }
+
+            // Validate time selection
+            if (!startTimeSelect.value || !endTimeSelect.value) {
+                e.preventDefault();
+                alert('Please select both start and end times.');
+                return false;
+            }
+
+            // Validate that end time is after start time
+            var startTime = startTimeSelect.value;
+            var endTime = endTimeSelect.value;
+
+            if (endTime <= startTime) {
+                e.preventDefault();
+                alert('End time must be after start time.');
+                return false;
+            }
+
+            // Validate patient availability
+            var patientId = patientSelect.value;
+            var doctorId = doctorSelect.value;
+            var dateValue = dateInput.value;
+
+            if (!isPatientTimeSlotAvailable(patientId, dateValue, startTime, endTime)) {
+                e.preventDefault();
+                alert('This patient already has an appointment at the selected time. Please choose a different time.');
+                return false;
+            }
+
+            // Validate doctor availability
+            if (!isDoctorTimeSlotAvailable(doctorId, dateValue, startTime, endTime)) {
+                e.preventDefault();
+                alert('This time slot is no longer available for the selected doctor. Please choose a different time.');
+                return false;
+            }
+        });
+    }
+
+    // Initialize time slots if form is pre-filled
+    updateTimeSlots();
+});
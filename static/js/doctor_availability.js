@@ -0,0 +1,500 @@
+// Get booked slots data from hidden element
+// Get booked slots data from hidden element
+var bookedSlots = {};
+var bookedSlotsElement = document.getElementById('bookedSlotsData');
+if (bookedSlotsElement && bookedSlotsElement.textContent.trim()) {
+    try {
+        bookedSlots = JSON.parse(bookedSlotsElement.textContent);
+    } catch (e) {
+        console.error('Error parsing booked slots:', e);
+        bookedSlots = {};
+    }
+}
+
+// Simple Quick Book function
+function quickBook(date, doctorId, startTime, endTime, doctorName) {
+    console.log('Quick booking for:', {date, doctorId, startTime, endTime, doctorName});
+
+    // Set the fixed values (doctor and date)
+    document.getElementById('quickBookDoctorId').value = doctorId;
+    document.getElementById('quickBookDate').value = date;
+    document.getElementById('quickBookDoctorName').textContent = 'Dr. ' + doctorName;
+
+    // Format and display the date
+    const dateObj = new Date(date + 'T00:00:00');
+    const formattedDate = dateObj.toLocaleDateString('en-US', { 
+        weekday: 'long', 
+        year: 'numeric', 
+        month: 'long', 
+        day: 'numeric' 
+    });
+    document.getElementById('quickBookDateDisplay').textContent = formattedDate;
+
+    // If a specific time slot was clicked, pre-fill it
+    if (startTime && endTime) {
+        document.getElementById('quickBookStartTime').value = startTime;
+        document.getElementById('quickBookEndTime').value = endTime;
+        document.getElementById('quickBookTimeDisplay').textContent = startTime + ' - ' + endTime;
+    } else {
+        document.getElementById('quickBookTimeDisplay').textContent = 'Please select a time';
+        // Clear time selections
+        document.getElementById('quickBookStartTime').value = '';
+        document.getElementById('quickBookEndTime').value = '';
+    }
+
+    // Reset patient selection and diagnosis
+    document.getElementById('quickBookPatientSelect').value = '';
+    document.querySelector('#quickBookForm .patient-typeahead-input').value = '';
+    document.getElementById('quickBookForm').querySelector('textarea[name="diagnosis"]').value = '';
+
+    // Load available time slots for this doctor and date
+    loadAvailableTimeSlots(doctorId, date);
+
+    // Show modal
+    const modal = new bootstrap.Modal(document.getElementById('quickBookModal'));
+    modal.show();
+}
+
+// Load available time slots (only show available times like in appointments page)
+function loadAvailableTimeSlots(doctorId, date) {
+    const startTimeSelect = document.getElementById('quickBookStartTime');
+    const endTimeSelect = document.getElementById('quickBookEndTime');
+    const availabilityInfo = document.getElementById('quickBookAvailabilityInfo');
+
+    // Clear existing options
+    startTimeSelect.innerHTML = '<option value="" disabled selected>Start Time</option>';
+    endTimeSelect.innerHTML = '<option value="" disabled selected>End Time</option>';
+
+    // Get booked slots for this doctor and date
+    const key = doctorId + '_' + date;
+    const bookedForThisSlot = bookedSlots[key] || [];
+
+    // Generate all possible time slots (8:00 AM to 6:00 PM in 30-minute intervals)
+    const timeSlots = [];
+    for (let hour = 8; hour <= 17; hour++) {
+        for (let minute = 0; minute < 60; minute += 30) {
+            // Skip times after 5:30 PM (17:30)
+            if (hour === 17 && minute > 0) break;
+
+            const hourStr = hour.toString().padStart(2, '0');
+            const minuteStr = minute.toString().padStart(2, '0');
+            timeSlots.push(`${hourStr}:${minuteStr}`);
+        }
+    }
+
+    // Find available start times (30-minute slots that don't conflict with booked appointments)
+    const availableStartTimes = [];
+
+    for (let i = 0; i < timeSlots.length - 1; i++) {
+        const startTime = timeSlots[i];
+        const endTime = timeSlots[i + 1];
+
+        // Check if this time slot is available (no conflict with existing appointments)
+        if (isTimeSlotAvailable(doctorId, date, startTime, endTime, bookedForThisSlot)) {
+            availableStartTimes.push(startTime);
+
+            const option = document.createElement('option');
+            option.value = startTime;
+            option.textContent = startTime;
+            startTimeSelect.appendChild(option);
+        }
+    }
+
+    if (availableStartTimes.length === 0) {
+        availabilityInfo.textContent = 'No available time slots for this doctor on the selected date';
+        availabilityInfo.className = 'form-text text-danger';
+    } else {
+        availabilityInfo.textContent = availableStartTimes.length + ' available time slot(s)';
+        availabilityInfo.className = 'form-text text-success';
+    }
+}
+
+// Check if a time slot is available (same logic as appointments page)
+function isTimeSlotAvailable(doctorId, dateString, startTime, endTime, bookedForThisSlot) {
+    // Convert start and end times to minutes for easier comparison
+    function timeToMinutes(timeStr) {
+        const parts = timeStr.split(':');
+        return parseInt(parts[0]) * 60 + parseInt(parts[1]);
+    }
+
+    const startMinutes = timeToMinutes(startTime);
+    const endMinutes = timeToMinutes(endTime);
+
+    // Check for conflicts with existing appointments
+    for (let i = 0; i < bookedForThisSlot.length; i++) {
+        const bookedStart = timeToMinutes(bookedForThisSlot[i].start);
+        const bookedEnd = timeToMinutes(bookedForThisSlot[i].end);
+
+        // Check for overlap
+        if ((startMinutes < bookedEnd) && (endMinutes > bookedStart)) {
+            return false; // Conflict found
+        }
+    }
+
+    return true; // No conflicts
+}
+
+// Update end time options when start time is selected
+function updateEndTimeOptions() {
+    const startTime = document.getElementById('quickBookStartTime').value;
+    const endTimeSelect = document.getElementById('quickBookEndTime');
+    const doctorId = document.getElementById('quickBookDoctorId').value;
+    const date = document.getElementById('quickBookDate').value;
+
+    if (!startTime) return;
+
+    // Clear existing options
+    endTimeSelect.innerHTML = '<option value="" disabled selected>End Time</option>';
+
+    // Get booked slots for this doctor and date
+    const key = doctorId + '_' + date;
+    const bookedForThisSlot = bookedSlots[key] || [];
+
+    // Convert start time to minutes for duration calculation
+    function timeToMinutes(timeStr) {
+        const parts = timeStr.split(':');
+        return parseInt(parts[0]) * 60 + parseInt(parts[1]);
+    }
+
+    const startMinutes = timeToMinutes(startTime);
+
+    // Generate time slots from selected start time onwards
+    const timeSlots = [];
+    for (let hour = 8; hour <= 17; hour++) {
+        for (let minute = 0; minute < 60; minute += 30) {
+            if (hour === 17 && minute > 0) break;
+
+            const hourStr = hour.toString().padStart(2, '0');
+            const minuteStr = minute.toString().padStart(2, '0');
+            const slot = `${hourStr}:${minuteStr}`;
+
+            // Only add slots that are after the selected start time
+            if (slot > startTime) {
+                const slotMinutes = timeToMinutes(slot);
+                const duration = slotMinutes - startMinutes;
+
+                // Check if duration is within limits (30 minutes to 2 hours)
+                if (duration >= 30 && duration <= 120) {
+                    // Check if this end time would create a valid, available appointment
+                    if (isTimeSlotAvailable(doctorId, date, startTime, slot, bookedForThisSlot)) {
+                        const option = document.createElement('option');
+                        option.value = slot;
+                        option.textContent = slot;
+                        endTimeSelect.appendChild(option);
+                    }
+                }
+            }
+        }
+    }
+
+    // Update the time display
+    document.getElementById('quickBookTimeDisplay').textContent = startTime + ' - (select end time)';
+
+    // Show duration info
+    const availabilityInfo = document.getElementById('quickBookAvailabilityInfo');
+    const availableOptions = endTimeSelect.querySelectorAll('option').length - 1; // Subtract 1 for the disabled option
+
+    if (availableOptions === 0) {
+        availabilityInfo.textContent = 'No valid end times available (must be 30 mins - 2 hours duration)';
+        availabilityInfo.className = 'form-text text-danger';
+    } else {
+        availabilityInfo.textContent = availableOptions + ' valid end time(s) available (30 mins - 2 hours duration)';
+        availabilityInfo.className = 'form-text text-success';
+    }
+}
+
+// Update time display when end time is selected
+function updateTimeDisplay() {
+    const startTime = document.getElementById('quickBookStartTime').value;
+    const endTime = document.getElementById('quickBookEndTime').value;
+
+    if (startTime && endTime) {
+        // Calculate and display duration
+        function timeToMinutes(timeStr) {
+            const parts = timeStr.split(':');
+            return parseInt(parts[0]) * 60 + parseInt(parts[1]);
+        }
+
+        const startMinutes = timeToMinutes(startTime);
+        const endMinutes = timeToMinutes(endTime);
+        const duration = endMinutes - startMinutes;
+
+        document.getElementById('quickBookTimeDisplay').textContent = `${startTime} - ${endTime} (${duration} minutes)`;
+
+        // Update availability info with duration validation
+        const availabilityInfo = document.getElementById('quickBookAvailabilityInfo');
+        if (duration < 30) {
+            availabilityInfo.textContent = 'Duration must be at least 30 minutes';
+            availabilityInfo.className = 'form-text text-danger';
+        } else if (duration > 120) {
+            availabilityInfo.textContent = 'Duration cannot exceed 2 hours';
+            availabilityInfo.className = 'form-text text-danger';
+        } else {
+            availabilityInfo.textContent = `Valid duration: ${duration} minutes`;
+            availabilityInfo.className = 'form-text text-success';
+        }
+    }
+}
+
+// Load all appointments for a specific doctor and date with full details
+function loadAllAppointments(doctorId, doctorName, date) {
+    const contentDiv = document.getElementById('viewAllAppointmentsContent');
+    const modalLabel = document.getElementById('viewAllAppointmentsModalLabel');
+
+    // Update modal title
+    modalLabel.textContent = `All Appointments - Dr. ${doctorName} - ${new Date(date + 'T00:00:00').toLocaleDateString()}`;
+
+    // Show loading
+    contentDiv.innerHTML = `
+        <div class="text-center py-4">
+            <div class="spinner-border text-primary" role="status">
+                <span class="visually-hidden">Loading...</span>
+            </div>
+            <p class="mt-2 text-muted">Loading appointments...</p>
+        </div>
+    `;
+
+    // Get appointments data from hidden element
+    const appointmentsDataElement = document.getElementById('appointmentsData');
+    let allAppointmentsData = {};
+
+    if (appointmentsDataElement && appointmentsDataElement.textContent.trim()) {
+        try {
+            allAppointmentsData = JSON.parse(appointmentsDataElement.textContent);
+        } catch (e) {
+            console.error('Error parsing appointments data:', e);
+        }
+    }
+
+    // Get appointments for this specific doctor
+    const appointments = allAppointmentsData[doctorId] || [];
+
+    if (appointments.length === 0) {
+        contentDiv.innerHTML = `
+            <div class="text-center py-4">
+                <i class="fas fa-calendar-times fa-3x text-muted mb-3"></i>
+                <h5 class="text-muted">No Appointments</h5>
+                <p class="text-muted">No appointments found for this doctor on the selected date.</p>
+            </div>
+        `;
+    } else {
+        let appointmentsHTML = `
+            <div class="appointments-container">
+                <div class="mb-3">
+                    <small class="text-muted">Showing ${appointments.length} appointment(s) for this day</small>
+                </div>
+        `;
+
+        appointments.forEach((appt, index) => {
+            // Calculate duration
+            const startParts = appt.start_time.split(':');
+            const endParts = appt.end_time.split(':');
+            const startMinutes = parseInt(startParts[0]) * 60 + parseInt(startParts[1]);
+            const endMinutes = parseInt(endParts[0]) * 60 + parseInt(endParts[1]);
+            const duration = endMinutes - startMinutes;
+
+            appointmentsHTML += `
+                <div class="card appointment-card mb-3 border-0 shadow-sm">
+                    <div class="card-body">
+                        <div class="row">
+                            <div class="col-md-8">
+                                <h6 class="card-title mb-3 text-primary">
+                                    <i class="fas fa-clock me-2"></i>
+                                    ${appt.start_time} - ${appt.end_time} 
+                                    <span class="badge bg-info ms-2">${duration} mins</span>
+                                </h6>
+
+                                <div class="patient-info mb-2">
+                                    <strong><i class="fas fa-user me-2 text-success"></i>Patient:</strong>
+                                    <span class="ms-2">${appt.patient_name}</span>
+                                </div>
+
+                                <div class="contact-info mb-3">
+                                    <strong><i class="fas fa-phone me-2 text-info"></i>Phone:</strong>
+                                    <span class="ms-2">${appt.patient_phone}</span>
+                                </div>
+
+                                ${appt.diagnosis && appt.diagnosis !== 'No diagnosis notes' ? `
+                                <div class="diagnosis-info">
+                                    <strong><i class="fas fa-file-medical me-2 text-danger"></i>Diagnosis Notes:</strong>
+                                    <div class="ms-4 mt-1 p-2 bg-light rounded">
+                                        <small class="text-muted">${appt.diagnosis}</small>
+                                    </div>
+                                </div>
+                                ` : ''}
+                            </div>
+
+                            <div class="col-md-4">
+                                <div class="appointment-meta text-end">
+                                    <div class="mb-2">
+                                        <span class="badge ${appt.status === 'Today' ? 'bg-warning text-dark' : appt.status === 'Upcoming' ? 'bg-success' : 'bg-secondary'}">
+                                            ${appt.status}
+                                        </span>
+                                    </div>
+                                    <div class="text-muted small">
+                                        <i class="fas fa-calendar-plus me-1"></i>
+                                        Created: ${appt.date_created}
+                                    </div>
+                                    <div class="text-muted small mt-1">
+                                        <i class="fas fa-id-badge me-1"></i>
+                                        ID: ${appt.id}
+                                    </div>
+                                </div>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+            `;
+        });
+
+        appointmentsHTML += `</div>`;
+        contentDiv.innerHTML = appointmentsHTML;
+    }
+}
+
+// Apply positioning to timeline slots and setup event listeners
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('DOM loaded - setting up event listeners');
+
+    // Position timeline slots
+    const timelineSlots = document.querySelectorAll('.timeline-slot');
+    timelineSlots.forEach(slot => {
+        const start = slot.getAttribute('data-start');
+        const width = slot.getAttribute('data-width');
+        if (start && width) {
+            slot.style.left = start + '%';
+            slot.style.width = width + '%';
+        }
+    });
+
+    // Initialize tooltips
+    var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
+    var tooltipList = tooltipTriggerList.map(function (tooltipTriggerEl) {
+        return new bootstrap.Tooltip(tooltipTriggerEl);
+    });
+
+    // Add click event listeners for timeline slots
+    document.querySelectorAll('.available-slot.timeline-slot').forEach(slot => {
+        slot.addEventListener('click', function() {
+            console.log('Timeline slot clicked');
+            const date = this.getAttribute('data-date');
+            const doctorId = this.getAttribute('data-doctor-id');
+            const startTime = this.getAttribute('data-start-time');
+            const endTime = this.getAttribute('data-end-time');
+            const doctorName = this.getAttribute('data-doctor-name');
+
+            quickBook(date, doctorId, startTime, endTime, doctorName);
+        });
+    });
+
+    // Add click event listeners for slot items
+    document.querySelectorAll('.slot-item').forEach(slot => {
+        slot.addEventListener('click', function() {
+            console.log('Slot item clicked');
+            const date = this.getAttribute('data-date');
+            const doctorId = this.getAttribute('data-doctor-id');
+            const startTime = this.getAttribute('data-start-time');
+            const endTime = this.getAttribute('data-end-time');
+            const doctorName = this.getAttribute('data-doctor-name');
+
+            quickBook(date, doctorId, startTime, endTime, doctorName);
+        });
+    });
+
+    // Add click event listeners for the main Book Appointment buttons
+    document.querySelectorAll('.quick-book-all-btn').forEach(button => {
+        button.addEventListener('click', function() {
+            console.log('Quick book button clicked');
+            const date = this.getAttribute('data-date');
+            const doctorId = this.getAttribute('data-doctor-id');
+            const doctorName = this.getAttribute('data-doctor-name');
+
+            // Open modal without pre-selecting a specific time
+            quickBook(date, doctorId, '', '', doctorName);
+        });
+    });
+
+    // Add click event listeners for View All Appointments buttons
+    document.querySelectorAll('.view-all-appointments-btn').forEach(button => {
+        button.addEventListener('click', function() {
+            console.log('View all appointments clicked');
+            const doctorId = this.getAttribute('data-doctor-id');
+            const doctorName = this.getAttribute('data-doctor-name');
+            const date = this.getAttribute('data-date');
+
+            // Load and show all appointments in modal
+            loadAllAppointments(doctorId, doctorName, date);
+
+            // Show modal
+            const modal = new bootstrap.Modal(document.getElementById('viewAllAppointmentsModal'));
+            modal.show();
+        });
+    });
+
+    // Add event listeners for time selection in the modal
+    document.getElementById('quickBookStartTime').addEventListener('change', function() {
+        updateEndTimeOptions();
+    });
+
+    document.getElementById('quickBookEndTime').addEventListener('change', function() {
+        updateTimeDisplay();
+    });
+
+    // Form validation
+    document.getElementById('quickBookForm').addEventListener('submit', function(e) {
+        const patientSelect = document.getElementById('quickBookPatientSelect');
+        const startTime = document.getElementById('quickBookStartTime').value;
+        const endTime = document.getElementById('quickBookEndTime').value;
+
+        if (!patientSelect.value) {
+            e.preventDefault();
+            alert('Please select a patient for the appointment.');
+            document.querySelector('#quickBookForm .patient-typeahead-input').focus();
+            return false;
+        }
+
+        if (!startTime || !endTime) {
+            e.preventDefault();
+            alert('Please select both start and end times.');
+            return false;
+        }
+
+        if (endTime <= startTime) {
+            e.preventDefault();
+            alert('End time must be after start time.');
+            return false;
+        }
+
+        // Validate duration (30 minutes to 2 hours)
+        function timeToMinutes(timeStr) {
+            const parts = timeStr.split(':');
+            return parseInt(parts[0]) * 60 + parseInt(parts[1]);
+        }
+
+        const startMinutes = timeToMinutes(startTime);
+        const endMinutes = timeToMinutes(endTime);
+        const duration = endMinutes - startMinutes;
+
+        if (duration < 30) {
+            e.preventDefault();
+            alert('Appointment duration must be at least 30 minutes.');
+            return false;
+        }
+
+        if (duration > 120) {
+            e.preventDefault();
+            alert('Appointment duration cannot exceed 2 hours.');
+            return false;
+        }
+
+        // Show loading state
+        const submitBtn = this.querySelector('button[type="submit"]');
+        submitBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-1"></i>Booking...';
+        submitBtn.disabled = true;
+    });
+});
+
+// Auto-refresh page every 5 minutes to show updated availability
+setTimeout(function() {
+    window.location.reload();
+}, 300000); // 5 minutes
@@ -0,0 +1,11 @@
+// Set today's date as default in the date field
+document.addEventListener('DOMContentLoaded', function() {
+    const dateField = document.querySelector('input[name="date_prescribed"]');
+    if (dateField) {
+        const today = new Date();
+        const yyyy = today.getFullYear();
+        const mm = String(today.getMonth() + 1).padStart(2, '0');
+        const dd = String(today.getDate()).padStart(2, '0');
+        dateField.value = `${yyyy}-${mm}-${dd}`;
+    }
+});
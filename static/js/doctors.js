@@ -0,0 +1,55 @@
+// Initialize tooltips
+document.addEventListener('DOMContentLoaded', function() {
+    var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
+    var tooltipList = tooltipTriggerList.map(function (tooltipTriggerEl) {
+        return new bootstrap.Tooltip(tooltipTriggerEl);
+    });
+});
+
+// Load older appointments for a doctor, one page at a time
+function escapeHtml(value) {
+    var div = document.createElement('div');
+    div.textContent = value == null ? '' : value;
+    return div.innerHTML;
+}
+
+function loadMoreAppointments(doctorId) {
+    var toggleBtn = document.getElementById('toggleBtn' + doctorId);
+    var tbody = document.getElementById('doctorAppointments' + doctorId);
+    var offset = parseInt(toggleBtn.dataset.offset, 10);
+    var total = parseInt(toggleBtn.dataset.total, 10);
+    var statusBadges = {
+        'Completed': '<span class="badge bg-secondary">Completed</span>',
+        'Today': '<span class="badge bg-warning text-dark">Today</span>',
+        'Upcoming': '<span class="badge bg-success">Upcoming</span>'
+    };
+
+    toggleBtn.disabled = true;
+    fetch(toggleBtn.dataset.url + '?offset=' + offset)
+        .then(function (response) { return response.json(); })
+        .then(function (data) {
+            data.appointments.forEach(function (appointment) {
+                var diagnosis = appointment.diagnosis
+                    ? '<span class="badge bg-info text-dark" title="' + escapeHtml(appointment.diagnosis) + '">' + escapeHtml(appointment.diagnosis.length > 20 ? appointment.diagnosis.slice(0, 17) + '...' : appointment.diagnosis) + '</span>'
+                    : '<span class="badge bg-secondary">Not diagnosed</span>';
+                var row = document.createElement('tr');
+                row.innerHTML = '<td>' + appointment.date + '</td>' +
+                    '<td>' + appointment.start_time + ' - ' + appointment.end_time + '</td>' +
+                    '<td>' + escapeHtml(appointment.patient_name) + '</td>' +
+                    '<td>' + diagnosis + '</td>' +
+                    '<td>' + statusBadges[appointment.status] + '</td>';
+                tbody.appendChild(row);
+            });
+            offset += data.appointments.length;
+            toggleBtn.dataset.offset = offset;
+            if (data.next_offset === null) {
+                toggleBtn.parentElement.remove();
+            } else {
+                toggleBtn.disabled = false;
+                toggleBtn.innerHTML = '<i class="fas fa-chevron-down me-1"></i>View More (' + (total - offset) + ' more)';
+            }
+        })
+        .catch(function () {
+            toggleBtn.disabled = false;
+        });
+}
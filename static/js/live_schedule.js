@@ -0,0 +1,155 @@
+// Live updates of today's appointments on the doctor pages, over server-sent events.
+// The container says how to show them: "list" (dashboard), "table" (My Appointments,
+// only today's rows change) or "reload" (empty page, reload when one is booked).
+(function() {
+    var container = document.querySelector('[data-live-schedule]');
+    if (!container || !window.EventSource) {
+        return;
+    }
+    var mode = container.dataset.liveSchedule;
+    var today = container.dataset.today;
+
+    function truncate(text, length) {
+        return text.length > length ? text.slice(0, length - 3) + '...' : text;
+    }
+
+    function element(tag, className, text) {
+        var node = document.createElement(tag);
+        if (className) {
+            node.className = className;
+        }
+        if (text !== undefined) {
+            node.textContent = text;
+        }
+        return node;
+    }
+
+    function withIcon(node, icon, text) {
+        node.appendChild(element('i', 'fas ' + icon + ' me-1'));
+        node.appendChild(document.createTextNode(text));
+        return node;
+    }
+
+    function listItem(appointment) {
+        var item = element('div', 'list-group-item border-0 px-0');
+        var row = element('div', 'd-flex justify-content-between align-items-start');
+        var details = element('div');
+        details.appendChild(element('h6', 'mb-1', appointment.patient));
+        details.appendChild(withIcon(element('p', 'mb-1 text-muted small'), 'fa-clock',
+                                     appointment.start_time + ' - ' + appointment.end_time));
+        if (appointment.diagnosis) {
+            details.appendChild(withIcon(element('p', 'mb-0 text-muted small'), 'fa-stethoscope',
+                                         truncate(appointment.diagnosis, 50)));
+        }
+        var now = new Date();
+        var clock = ('0' + now.getHours()).slice(-2) + ':' + ('0' + now.getMinutes()).slice(-2);
+        var completed = appointment.start_time < clock;
+        row.appendChild(details);
+        row.appendChild(element('span', 'badge ' + (completed ? 'bg-secondary' : 'bg-success'),
+                                completed ? 'Completed' : 'Upcoming'));
+        item.appendChild(row);
+        item.dataset.sort = appointment.start_time;
+        return item;
+    }
+
+    function tableRow(appointment) {
+        var row = element('tr');
+        row.appendChild(element('td', '', appointment.date));
+        row.appendChild(element('td', '', appointment.start_time + ' - ' + appointment.end_time));
+        row.appendChild(element('td', '', appointment.patient));
+        var diagnosis = element('td');
+        diagnosis.appendChild(appointment.diagnosis
+            ? element('span', 'badge bg-info text-dark', truncate(appointment.diagnosis, 30))
+            : element('span', 'badge bg-secondary', 'Not diagnosed'));
+        row.appendChild(diagnosis);
+        var status = element('td');
+        status.appendChild(element('span', 'badge bg-warning text-dark', 'Today'));
+        row.appendChild(status);
+        row.dataset.date = appointment.date;
+        row.dataset.sort = appointment.date + ' ' + appointment.start_time;
+        return row;
+    }
+
+    function remove(id) {
+        var existing = container.querySelector('[data-appointment-id="' + id + '"]');
+        if (existing) {
+            existing.remove();
+        }
+    }
+
+    function upsert(appointment) {
+        remove(appointment.id);
+        var node = mode === 'list' ? listItem(appointment) : tableRow(appointment);
+        node.dataset.appointmentId = appointment.id;
+        // The dashboard lists earliest first, the table latest first
+        var before = Array.prototype.find.call(container.children, function(other) {
+            return mode === 'list' ? other.dataset.sort > node.dataset.sort : other.dataset.sort < node.dataset.sort;
+        });
+        container.insertBefore(node, before || null);
+    }
+
+    function updateCounts() {
+        var count = container.children.length;
+        document.querySelectorAll('[data-live-count]').forEach(function(badge) {
+            badge.textContent = count;
+        });
+        var empty = document.querySelector('[data-live-empty]');
+        if (empty) {
+            empty.classList.toggle('d-none', count > 0);
+        }
+    }
+
+    var handlers = {
+        snapshot: function(appointments) {
+            if (mode === 'reload') {
+                if (appointments.length) {
+                    window.location.reload();
+                }
+                return;
+            }
+            // Replace today's appointments with the server's view of them
+            Array.prototype.slice.call(container.children).forEach(function(node) {
+                if (mode === 'list' || node.dataset.date === today) {
+                    node.remove();
+                }
+            });
+            appointments.forEach(upsert);
+        },
+        created: function(appointment) {
+            if (mode === 'reload') {
+                window.location.reload();
+                return;
+            }
+            upsert(appointment);
+        },
+        changed: function(appointment) {
+            upsert(appointment);
+        },
+        cancelled: function(appointment) {
+            remove(appointment.id);
+        },
+        reset: function() {
+            window.location.reload();
+        }
+    };
+
+    function connect() {
+        var source = new EventSource(container.dataset.streamUrl);
+        Object.keys(handlers).forEach(function(name) {
+            source.addEventListener(name, function(event) {
+                handlers[name](JSON.parse(event.data));
+                if (mode !== 'reload') {
+                    updateCounts();
+                }
+            });
+        });
+        source.onerror = function() {
+            // The browser reconnects by itself unless the server refused the stream
+            if (source.readyState === EventSource.CLOSED) {
+                setTimeout(connect, 60000);
+            }
+        };
+    }
+
+    connect();
+})();
@@ -0,0 +1,30 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const passwordToggle = document.getElementById('passwordToggle');
+    const passwordInput = document.getElementById('password');
+
+    passwordToggle.addEventListener('click', function() {
+        // Toggle password visibility
+        if (passwordInput.type === 'password') {
+            passwordInput.type = 'text';
+            passwordToggle.innerHTML = '<i class="fas fa-eye-slash"></i>';
+            passwordToggle.title = 'Hide password';
+        } else {
+            passwordInput.type = 'password';
+            passwordToggle.innerHTML = '<i class="fas fa-eye"></i>';
+            passwordToggle.title = 'Show password';
+        }
+    });
+
+    // Add keyboard support (Space or Enter to toggle)
+    passwordToggle.addEventListener('keydown', function(e) {
+        if (e.key === ' ' || e.key === 'Enter') {
+            e.preventDefault();
+            passwordToggle.click();
+        }
+    });
+
+    // Make the toggle focusable for accessibility
+    passwordToggle.setAttribute('tabindex', '0');
+    passwordToggle.setAttribute('role', 'button');
+    passwordToggle.setAttribute('aria-label', 'Show password');
+});
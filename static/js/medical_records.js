@@ -0,0 +1,44 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const uploadForm = document.getElementById('uploadForm');
+    const toggleButton = document.getElementById('toggleUploadForm');
+    const cancelButton = document.getElementById('cancelUpload');
+    const fileInput = document.querySelector('input[name="medical_file"]');
+
+    // Toggle form visibility
+    toggleButton.addEventListener('click', function() {
+        if (uploadForm.style.display === 'none') {
+            uploadForm.style.display = 'block';
+            toggleButton.innerHTML = '<i class="fas fa-eye me-1"></i>View Records';
+            toggleButton.classList.remove('btn-primary');
+            toggleButton.classList.add('btn-secondary');
+        } else {
+            uploadForm.style.display = 'none';
+            toggleButton.innerHTML = '<i class="fas fa-upload me-1"></i>Upload Medical Record';
+            toggleButton.classList.remove('btn-secondary');
+            toggleButton.classList.add('btn-primary');
+        }
+    });
+
+    // Cancel button handler
+    cancelButton.addEventListener('click', function() {
+        uploadForm.style.display = 'none';
+        toggleButton.innerHTML = '<i class="fas fa-upload me-1"></i>Upload Medical Record';
+        toggleButton.classList.remove('btn-secondary');
+        toggleButton.classList.add('btn-primary');
+    });
+
+    // File size validation
+    const medicalRecordForm = document.getElementById('medicalRecordForm');
+    if (medicalRecordForm) {
+        medicalRecordForm.addEventListener('submit', function(e) {
+            const file = fileInput.files[0];
+            const maxSize = 10 * 1024 * 1024; // 10MB in bytes
+
+            if (file && file.size > maxSize) {
+                e.preventDefault();
+                alert('File size must be less than 10MB.');
+                return false;
+            }
+        });
+    }
+});
@@ -0,0 +1,28 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Set today's date as the max for date of birth input
+    const today = new Date();
+    const yyyy = today.getFullYear();
+    let mm = today.getMonth() + 1;
+    let dd = today.getDate();
+
+    if (mm < 10) mm = '0' + mm;
+    if (dd < 10) dd = '0' + dd;
+
+    const maxDate = `${yyyy}-${mm}-${dd}`;
+    const dobInputs = document.querySelectorAll('input[name="date_of_birth"]');
+    dobInputs.forEach(input => {
+        input.max = maxDate;
+    });
+
+    // Initialize tooltips
+    var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'))
+    var tooltipList = tooltipTriggerList.map(function (tooltipTriggerEl) {
+        return new bootstrap.Tooltip(tooltipTriggerEl)
+    });
+
+    // Auto-focus search input
+    const searchInput = document.querySelector('input[name="search"]');
+    if (searchInput && !searchInput.value) {
+        searchInput.focus();
+    }
+});
@@ -0,0 +1,18 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Patient selection handler for real-time info
+    const patientSelect = document.getElementById('patientSelect');
+    if (patientSelect) {
+        patientSelect.addEventListener('change', function() {
+            const patientId = this.value;
+            if (patientId) {
+                fetch(`/get_patient_info/${patientId}`)
+                    .then(response => response.json())
+                    .then(data => {
+                        // You can display patient info if needed
+                        console.log('Patient info:', data);
+                    })
+                    .catch(error => console.error('Error fetching patient info:', error));
+            }
+        });
+    }
+});
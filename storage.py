@@ -0,0 +1,114 @@
+import gzip
+import os
+import shutil
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+# Record types worth trying to compress at rest (images and PDFs are already compressed)
+COMPRESSIBLE_EXTENSIONS = {'txt', 'doc', 'docx'}
+CODEC_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+CHUNK_SIZE = 64 * 1024
+
+
+def available_codecs():
+    """Codecs that can be used on this installation"""
+    codecs = ['none', 'gzip']
+    if zstandard is not None:
+        codecs.append('zstd')
+    return codecs
+
+
+def stored_codec(path):
+    """Work out which codec a stored file was written with from its suffix"""
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if path.endswith(suffix):
+            return codec
+    return None
+
+
+def is_compressible(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def _open_writer(path, codec):
+    if codec == 'gzip':
+        return gzip.open(path, 'wb', compresslevel=6)
+    return zstandard.ZstdCompressor(level=10).stream_writer(open(path, 'wb'), closefd=True)
+
+
+def compress_file(path, codec, max_ratio=0.9):
+    """Compress a stored record in place when it is worth it.
+
+    The file is compressed next to the original and only kept if the
+    compressed size is at most ``max_ratio`` of the original, so already
+    dense files (e.g. DOCX, which is a zip archive) stay raw. Returns the
+    path the record ended up stored at.
+    """
+    if codec not in CODEC_SUFFIXES:
+        return path
+    if codec == 'zstd' and zstandard is None:
+        return path
+
+    compressed_path = path + CODEC_SUFFIXES[codec]
+    with open(path, 'rb') as source, _open_writer(compressed_path, codec) as target:
+        shutil.copyfileobj(source, target, CHUNK_SIZE)
+
+    original_size = os.path.getsize(path)
+    if original_size and os.path.getsize(compressed_path) <= original_size * max_ratio:
+        os.remove(path)
+        return compressed_path
+
+    os.remove(compressed_path)
+    return path
+
+
+def open_record(path):
+    """Open a stored record for reading its original (decompressed) bytes"""
+    codec = stored_codec(path)
+    if codec == 'gzip':
+        return gzip.open(path, 'rb')
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+def iter_record(path, chunk_size=CHUNK_SIZE):
+    """Stream the decompressed contents of a record chunk by chunk"""
+    with open_record(path) as stream:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def storage_stats(records):
+    """Summarise disk usage for an iterable of (file_path, original_size) pairs"""
+    stats = {
+        'records': 0,
+        'compressed_records': 0,
+        'missing_files': 0,
+        'original_bytes': 0,
+        'stored_bytes': 0,
+        'by_codec': {},
+    }
+    for file_path, original_size in records:
+        if not os.path.exists(file_path):
+            stats['missing_files'] += 1
+            continue
+        stored_size = os.path.getsize(file_path)
+        codec = stored_codec(file_path) or 'none'
+        stats['records'] += 1
+        stats['original_bytes'] += original_size or stored_size
+        stats['stored_bytes'] += stored_size
+        if codec != 'none':
+            stats['compressed_records'] += 1
+        codec_stats = stats['by_codec'].setdefault(codec, {'records': 0, 'original_bytes': 0, 'stored_bytes': 0})
+        codec_stats['records'] += 1
+        codec_stats['original_bytes'] += original_size or stored_size
+        codec_stats['stored_bytes'] += stored_size
+    stats['saved_bytes'] = stats['original_bytes'] - stats['stored_bytes']
+    return stats